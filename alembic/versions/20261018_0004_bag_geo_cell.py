@@ -0,0 +1,44 @@
+# backend/alembic/versions/20261018_0004_bag_geo_cell.py
+"""Add bags.geo_cell grid column for radius search"""
+
+import math
+
+from alembic import op
+import sqlalchemy as sa
+
+# 20250811_0003 -> THIS
+revision = "20261018_0004"
+down_revision = "20250811_0003"
+branch_labels = None
+depends_on = None
+
+# Zamrznuta kopija geo.cell_for (GEO_CELL_DEG = 0.05) da migracija ne zavisi od app koda
+_CELL_DEG = 0.05
+_LAT_CELLS = int(round(180 / _CELL_DEG))
+_LNG_CELLS = int(round(360 / _CELL_DEG))
+
+
+def _cell_for(lat, lng):
+    iy = min(_LAT_CELLS - 1, max(0, int(math.floor((lat + 90.0) / _CELL_DEG))))
+    ix = int(math.floor((lng + 180.0) / _CELL_DEG)) % _LNG_CELLS
+    return f"{iy}:{ix}"
+
+
+def upgrade():
+    with op.batch_alter_table("bags") as b:
+        b.add_column(sa.Column("geo_cell", sa.String(), nullable=True))
+        b.create_index("ix_bags_geo_cell", ["geo_cell"])
+
+    # backfill postojećih kesa sa koordinatama
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, lat, lng FROM bags WHERE lat IS NOT NULL AND lng IS NOT NULL")).fetchall()
+    if rows:
+        conn.execute(
+            sa.text("UPDATE bags SET geo_cell = :cell WHERE id = :id"),
+            [{"id": r[0], "cell": _cell_for(r[1], r[2])} for r in rows],
+        )
+
+def downgrade():
+    with op.batch_alter_table("bags") as b:
+        b.drop_index("ix_bags_geo_cell")
+        b.drop_column("geo_cell")
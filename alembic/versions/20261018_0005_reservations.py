@@ -0,0 +1,29 @@
+# backend/alembic/versions/20261018_0005_reservations.py
+"""Create reservations table"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# 20261018_0004 -> THIS
+revision = "20261018_0005"
+down_revision = "20261018_0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "reservations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("bag_id", sa.Integer(), sa.ForeignKey("bags.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("customer_id", sa.Integer(), sa.ForeignKey("customers.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("kolicina", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("cena", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("NOW()")),
+    )
+    op.create_index("ix_reservations_bag_id", "reservations", ["bag_id"])
+    op.create_index("ix_reservations_customer_id", "reservations", ["customer_id"])
+
+def downgrade():
+    op.drop_index("ix_reservations_customer_id", table_name="reservations")
+    op.drop_index("ix_reservations_bag_id", table_name="reservations")
+    op.drop_table("reservations")
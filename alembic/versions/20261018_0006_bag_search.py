@@ -0,0 +1,44 @@
+# backend/alembic/versions/20261018_0006_bag_search.py
+"""Add bags.search_norm with trigram/tsvector indexes (Postgres) or FTS5 (SQLite)"""
+
+from alembic import op
+import sqlalchemy as sa
+
+import textsearch
+
+# 20261018_0005 -> THIS
+revision = "20261018_0006"
+down_revision = "20261018_0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("bags") as b:
+        b.add_column(sa.Column("search_norm", sa.String(), nullable=True))
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, naziv, opis FROM bags")).fetchall()
+    if rows:
+        conn.execute(
+            sa.text("UPDATE bags SET search_norm = :doc WHERE id = :id"),
+            [{"id": r[0], "doc": textsearch.document(r[1], r[2])} for r in rows],
+        )
+
+    if conn.dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX ix_bags_search_trgm ON bags USING gin (search_norm gin_trgm_ops)")
+        op.execute("CREATE INDEX ix_bags_search_tsv ON bags USING gin (to_tsvector('simple', coalesce(search_norm, '')))")
+    elif conn.dialect.name == "sqlite":
+        textsearch.install_sqlite_fts(conn)
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_bags_search_tsv")
+        op.execute("DROP INDEX IF EXISTS ix_bags_search_trgm")
+    elif conn.dialect.name == "sqlite":
+        for trigger in ("bags_fts_ai", "bags_fts_ad", "bags_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS bags_fts")
+    with op.batch_alter_table("bags") as b:
+        b.drop_column("search_norm")
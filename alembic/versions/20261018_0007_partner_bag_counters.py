@@ -0,0 +1,26 @@
+# backend/alembic/versions/20261018_0007_partner_bag_counters.py
+"""Create partner_bag_counters (per-partner bag counts by status)"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# 20261018_0006 -> THIS
+revision = "20261018_0007"
+down_revision = "20261018_0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "partner_bag_counters",
+        sa.Column("partner_id", sa.Integer(), sa.ForeignKey("partners.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("status", sa.String(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute(
+        "INSERT INTO partner_bag_counters (partner_id, status, count) "
+        "SELECT partner_id, status, COUNT(*) FROM bags GROUP BY partner_id, status"
+    )
+
+def downgrade():
+    op.drop_table("partner_bag_counters")
@@ -0,0 +1,34 @@
+# backend/alembic/versions/20261018_0008_data_versions.py
+"""Add updated_at to bags/partners and data_versions change counters (ETag)"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# 20261018_0007 -> THIS
+revision = "20261018_0008"
+down_revision = "20261018_0007"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("bags") as b:
+        b.add_column(sa.Column("updated_at", sa.DateTime(), nullable=True))
+    with op.batch_alter_table("partners") as b:
+        b.add_column(sa.Column("updated_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE bags SET updated_at = created_at")
+    op.execute("UPDATE partners SET updated_at = CURRENT_TIMESTAMP")
+
+    op.create_table(
+        "data_versions",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.execute("INSERT INTO data_versions (name, version) VALUES ('bags', 1), ('partners', 1)")
+
+def downgrade():
+    op.drop_table("data_versions")
+    with op.batch_alter_table("partners") as b:
+        b.drop_column("updated_at")
+    with op.batch_alter_table("bags") as b:
+        b.drop_column("updated_at")
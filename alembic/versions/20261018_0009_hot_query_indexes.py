@@ -0,0 +1,49 @@
+# backend/alembic/versions/20261018_0009_hot_query_indexes.py
+"""Composite and partial indexes for the public/partner hot queries"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# 20261018_0008 -> THIS
+revision = "20261018_0009"
+down_revision = "20261018_0008"
+branch_labels = None
+depends_on = None
+
+_ACTIVE = "status = 'active'"
+
+# (ime, tabela, kolone, parcijalni uslov)
+INDEXES = [
+    ("ix_bags_active_status_id", "bags", ["status", "id"], _ACTIVE),
+    ("ix_bags_active_cena_id", "bags", ["cena", "id"], _ACTIVE),
+    ("ix_bags_active_created_at_id", "bags", ["created_at", "id"], _ACTIVE),
+    ("ix_bags_partner_id_id", "bags", ["partner_id", "id"], None),
+    ("ix_bags_partner_id_created_at", "bags", ["partner_id", "created_at"], None),
+    ("ix_bags_lat_lng", "bags", ["lat", "lng"], None),
+    ("ix_partners_email", "partners", ["email"], None),
+]
+
+def upgrade():
+    ctx = op.get_context()
+    if ctx.dialect.name == "postgresql":
+        # CONCURRENTLY ne zaključava bags za upis, ali ne sme u transakciji
+        with ctx.autocommit_block():
+            for name, table, cols, where in INDEXES:
+                op.create_index(name, table, cols, postgresql_where=sa.text(where) if where else None,
+                                postgresql_concurrently=True, if_not_exists=True)
+            op.execute("ANALYZE bags")
+            op.execute("ANALYZE partners")
+    else:
+        for name, table, cols, where in INDEXES:
+            op.create_index(name, table, cols, sqlite_where=sa.text(where) if where else None, if_not_exists=True)
+        op.execute("ANALYZE")
+
+def downgrade():
+    ctx = op.get_context()
+    if ctx.dialect.name == "postgresql":
+        with ctx.autocommit_block():
+            for name, table, _, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,33 @@
+# backend/alembic/versions/20261018_0011_cluster_covering_index.py
+"""Covering partial index for map clusters (bbox + GROUP BY without table lookups)"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# 20261018_0010 -> THIS
+revision = "20261018_0011"
+down_revision = "20261018_0010"
+branch_labels = None
+depends_on = None
+
+_ACTIVE = "status = 'active'"
+
+def upgrade():
+    ctx = op.get_context()
+    if ctx.dialect.name == "postgresql":
+        with ctx.autocommit_block():
+            op.create_index("ix_bags_active_lat_lng_cena", "bags", ["lat", "lng", "cena"],
+                            postgresql_where=sa.text(_ACTIVE), postgresql_concurrently=True, if_not_exists=True)
+            op.execute("ANALYZE bags")
+    else:
+        op.create_index("ix_bags_active_lat_lng_cena", "bags", ["lat", "lng", "cena"],
+                        sqlite_where=sa.text(_ACTIVE), if_not_exists=True)
+        op.execute("ANALYZE bags")
+
+def downgrade():
+    ctx = op.get_context()
+    if ctx.dialect.name == "postgresql":
+        with ctx.autocommit_block():
+            op.drop_index("ix_bags_active_lat_lng_cena", table_name="bags", postgresql_concurrently=True, if_exists=True)
+    else:
+        op.drop_index("ix_bags_active_lat_lng_cena", table_name="bags", if_exists=True)
@@ -0,0 +1,36 @@
+# backend/alembic/versions/20261018_0012_bag_category.py
+"""Add bags.category with a covering partial index for the public filter and facets"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# 20261018_0011 -> THIS
+revision = "20261018_0012"
+down_revision = "20261018_0011"
+branch_labels = None
+depends_on = None
+
+_ACTIVE = "status = 'active'"
+
+def upgrade():
+    # nullable bez default-a: na Postgresu samo izmena kataloga, bez prepisivanja tabele
+    with op.batch_alter_table("bags") as b:
+        b.add_column(sa.Column("category", sa.String(), nullable=True))
+    ctx = op.get_context()
+    if ctx.dialect.name == "postgresql":
+        with ctx.autocommit_block():
+            op.create_index("ix_bags_active_category_cena", "bags", ["category", "cena"],
+                            postgresql_where=sa.text(_ACTIVE), postgresql_concurrently=True, if_not_exists=True)
+    else:
+        op.create_index("ix_bags_active_category_cena", "bags", ["category", "cena"],
+                        sqlite_where=sa.text(_ACTIVE), if_not_exists=True)
+
+def downgrade():
+    ctx = op.get_context()
+    if ctx.dialect.name == "postgresql":
+        with ctx.autocommit_block():
+            op.drop_index("ix_bags_active_category_cena", table_name="bags", postgresql_concurrently=True, if_exists=True)
+    else:
+        op.drop_index("ix_bags_active_category_cena", table_name="bags", if_exists=True)
+    with op.batch_alter_table("bags") as b:
+        b.drop_column("category")
@@ -0,0 +1,89 @@
+# bag_queries.py
+# Gradnja upita za listinge kesa (javni listing, partner strana, export). Iste funkcije koristi
+# check_query_plans.py, pa EXPLAIN regresija proverava baš ono što endpointi izvršavaju.
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import asc, desc, select
+
+import geo
+import models
+import pagination
+import serializers
+import textsearch
+
+Bag = models.Bag
+
+# sort_by koji mapira direktno na kolonu; nepoznat ključ se ponaša kao id
+SORT_COLUMNS = ("id", "naziv", "cena", "kolicina", "vreme_preuzimanja", "status", "category", "created_at")
+# relevance traži pretragu, distance traži lat/lng/radius_km (bez njih: id)
+SORT_KEYS = SORT_COLUMNS + ("relevance", "distance")
+
+
+def sort_column(sort_by: str):
+    return getattr(Bag, sort_by) if sort_by in SORT_COLUMNS else Bag.id
+
+
+def search(q, term: Optional[str], sort_by: str, dialect: str):
+    """Filter pretrage + sort izraz: (upit, sort kolona)."""
+    if term and sort_by == "relevance":
+        return textsearch.apply_ranked(q, Bag, term, dialect)
+    if term:
+        q = textsearch.apply(q, Bag, term, dialect)
+    return q, sort_column(sort_by)
+
+
+def public(dialect: str, term: Optional[str] = None, sort_by: str = "id",
+           min_price: Optional[float] = None, max_price: Optional[float] = None,
+           live_at: Optional[datetime] = None, pickup_from: Optional[datetime] = None,
+           pickup_to: Optional[datetime] = None, origin: Optional[Tuple[float, float]] = None,
+           within_km: Optional[float] = None):
+    """Aktivne kese sa svim filterima javnog listinga osim kategorije (baza za fasete): (upit, sort izraz)."""
+    q, sort_col = search(select(Bag).filter(models.bag_is_active()), term, sort_by, dialect)
+    if min_price is not None:
+        q = q.filter(Bag.cena >= min_price)
+    if max_price is not None:
+        q = q.filter(Bag.cena <= max_price)
+    # termin preuzimanja: opseg nad ix_bags_active_pickup_id; kese bez termina ne ulaze u ove filtere
+    if live_at is not None:
+        q = q.filter(Bag.kolicina > 0, Bag.vreme_preuzimanja >= live_at)
+    if pickup_from is not None:
+        q = q.filter(Bag.vreme_preuzimanja >= pickup_from)
+    if pickup_to is not None:
+        q = q.filter(Bag.vreme_preuzimanja <= pickup_to)
+    if within_km and origin is not None:
+        # kandidati preko geo_cell indeksa + bounding box-a, tačan haversine filter u SQL-u;
+        # sort, LIMIT i COUNT ostaju u bazi kao i bez radijusa
+        lat, lng = origin
+        distance = geo.distance_km(Bag, lat, lng, dialect)
+        q = geo.prefilter(q, Bag, lat, lng, within_km).filter(distance <= within_km)
+        if sort_by == "distance":
+            sort_col = distance.label("distance_km")
+    return q, sort_col
+
+
+def partner(q, partner_id: int, term: Optional[str], sort_by: str, dialect: str):
+    """q je select/Query sa kolonama koje endpoint vraća: (upit, sort izraz)."""
+    return search(q.filter(Bag.partner_id == partner_id), term, sort_by, dialect)
+
+
+def ordered(q, sort_col, sort_dir: str):
+    """Redosled za offset strane i export: sort kolona, pa id opadajuće."""
+    return q.order_by(desc(sort_col) if sort_dir == "desc" else asc(sort_col), desc(Bag.id))
+
+
+def page(q, sort_col, sort_dir: str, page_no: int, page_size: int, cursor: Optional[str] = None,
+         after: Optional[Dict[str, Any]] = None):
+    """Cursor mod (cursor nije None): keyset + jedan red viška za next_cursor; inače OFFSET strana."""
+    if cursor is not None:
+        return pagination.apply_keyset(q, sort_col, Bag.id, sort_dir, after).limit(page_size + 1)
+    return ordered(q, sort_col, sort_dir).offset((page_no - 1) * page_size).limit(page_size)
+
+
+def public_page(q, sort_col, sort_dir: str, page_no: int, page_size: int, cursor: Optional[str] = None,
+                after: Optional[Dict[str, Any]] = None):
+    """Javna strana: kolone BAG_PUBLIC_FIELDS (+ sort izraz za next_cursor u cursor modu)."""
+    q = q.with_only_columns(*serializers.bag_columns(
+        serializers.BAG_PUBLIC_FIELDS, extra=[sort_col] if cursor is not None else []
+    ))
+    return page(q, sort_col, sort_dir, page_no, page_size, cursor, after)
@@ -0,0 +1,212 @@
+# bench_api.py
+# Benchmark glavnih endpointa iz main.py: p50/p95/p99 i propusnost po scenariju, rezultat u JSON.
+#
+#   DATABASE_URL=sqlite:///./bench.db python generate_data.py --create-tables --bags 1000000
+#   DATABASE_URL=sqlite:///./bench.db python bench_api.py --requests 2000 --clients 50
+#   DATABASE_URL=... python bench_api.py --baseline bench_results/bench_20261018T120000.json
+#
+# App se pokreće in-process (httpx.ASGITransport), pa se meri server + baza bez mreže.
+# Parametri zahteva su nasumični ali deterministički (--seed); --no-cache gasi keš listinga.
+# Sa --baseline ispisuje promenu p95 po scenariju; --fail-on-regression vraća izlazni kod 1.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+import httpx
+from sqlalchemy import desc, func, select
+
+import database
+import models
+import main
+from generate_data import CATEGORIES, CITIES
+
+CATEGORY_VALUES = sorted(set(CATEGORIES.values()))
+SEARCH_TERMS = ["kroasan", "pica", "burek", "kolac", "voce", "susi", "sendvic", "kesa iznenadjenja"]
+
+
+def load_context(rnd: random.Random, sample: int) -> dict:
+    with database.SessionLocal() as db:
+        bag_ids = db.scalars(
+            select(models.Bag.id).where(models.Bag.status == "active").order_by(desc(models.Bag.id)).limit(sample)
+        ).all()
+        top = db.execute(
+            select(models.PartnerBagCounter.partner_id, func.sum(models.PartnerBagCounter.count))
+            .join(models.Partner, models.Partner.id == models.PartnerBagCounter.partner_id)
+            .where(models.Partner.is_active.is_(True))
+            .group_by(models.PartnerBagCounter.partner_id)
+            .order_by(desc(func.sum(models.PartnerBagCounter.count)))
+            .limit(1)
+        ).first()
+        n_bags = db.scalar(select(func.count(models.Bag.id)))
+    if not bag_ids or top is None:
+        raise SystemExit("Nema podataka — prvo pokreni generate_data.py")
+    partner_id = top[0]
+    token = main.create_access_token({"sub": str(partner_id), "role": "partner", "id": partner_id})
+    return {"rnd": rnd, "bag_ids": bag_ids, "partner_id": partner_id, "n_bags": n_bags,
+            "auth": {"Authorization": f"Bearer {token}"}, "etags": {}}
+
+
+def _city(ctx):
+    _, lat, lng, _ = ctx["rnd"].choice(CITIES)
+    return lat + ctx["rnd"].uniform(-0.03, 0.03), lng + ctx["rnd"].uniform(-0.03, 0.03)
+
+
+def _radius(ctx):
+    lat, lng = _city(ctx)
+    return f"/public/bags/page?lat={lat:.4f}&lng={lng:.4f}&radius_km=3&sort_by=distance&sort_dir=asc", {}
+
+
+def _revalidate(ctx):
+    path = f"/public/bags/page?page={ctx['rnd'].randint(1, 5)}"
+    return path, {"If-None-Match": ctx["etags"].get(path, '"none"')}
+
+
+# naziv -> (metoda, fabrika (putanja, zaglavlja), udeo od --requests, da li menja podatke)
+SCENARIOS = {
+    "public_page": ("GET", lambda c: (f"/public/bags/page?page={c['rnd'].randint(1, 20)}&page_size=20", {}), 1.0, False),
+    "public_page_cursor": ("GET", lambda c: ("/public/bags/page?cursor=&page_size=20", {}), 1.0, False),
+    "public_page_price": ("GET", lambda c: (
+        f"/public/bags/page?min_price={c['rnd'].randint(1, 5)}&max_price={c['rnd'].randint(6, 12)}"
+        f"&sort_by=cena&sort_dir=asc", {}), 1.0, False),
+    "public_page_facets": ("GET", lambda c: (
+        f"/public/bags/page?facets=true&category={c['rnd'].choice(CATEGORY_VALUES)}&max_price={c['rnd'].randint(4, 12)}",
+        {}), 1.0, False),
+    "public_search": ("GET", lambda c: (f"/public/bags/page?search={c['rnd'].choice(SEARCH_TERMS)}", {}), 1.0, False),
+    "public_radius": ("GET", _radius, 1.0, False),
+    "public_page_304": ("GET", _revalidate, 1.0, False),
+    "public_bag": ("GET", lambda c: (f"/public/bags/{c['rnd'].choice(c['bag_ids'])}", {}), 1.0, False),
+    "partners": ("GET", lambda c: ("/partners", {}), 0.25, False),
+    "partner_page": ("GET", lambda c: (f"/partner/bags/page?page={c['rnd'].randint(1, 5)}", c["auth"]), 1.0, False),
+    "partner_page_cursor": ("GET", lambda c: ("/partner/bags/page?cursor=", c["auth"]), 1.0, False),
+    "partner_counts": ("GET", lambda c: ("/partner/bags/counts", c["auth"]), 1.0, False),
+    "partner_export": ("GET", lambda c: ("/partner/bags/export?format=ndjson", c["auth"]), 0.05, False),
+    "reserve": ("POST", lambda c: (f"/public/bags/{c['rnd'].choice(c['bag_ids'])}/reserve", {}), 0.5, True),
+}
+
+
+async def run_scenario(client, ctx, method: str, factory, total: int, clients: int) -> dict:
+    latencies, sizes = [], []
+    statuses = {}
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            path, headers = factory(ctx)
+            t0 = time.perf_counter()
+            r = await client.request(method, path, headers=headers)
+            latencies.append(time.perf_counter() - t0)
+            sizes.append(len(r.content))
+            statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+            if "etag" in r.headers and r.status_code == 200:
+                ctx["etags"][path] = r.headers["etag"]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(q[49] * 1000, 3),
+        "p95_ms": round(q[94] * 1000, 3),
+        "p99_ms": round(q[98] * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+        "avg_bytes": round(sum(sizes) / len(sizes)),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "errors": sum(v for k, v in statuses.items() if k >= 400 and not (method == "POST" and k == 400)),
+    }
+
+
+async def run_all(names, ctx, total: int, clients: int, warmup: int) -> dict:
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        for name in names:
+            method, factory, share, _ = SCENARIOS[name]
+            n = max(10, int(total * share))
+            await run_scenario(client, ctx, method, factory, min(warmup, n), min(clients, 10))
+            res = await run_scenario(client, ctx, method, factory, n, clients)
+            results[name] = res
+            print(f"{name:22s} {res['rps']:9.1f} req/s  p50 {res['p50_ms']:8.2f}  p95 {res['p95_ms']:8.2f}  "
+                  f"p99 {res['p99_ms']:8.2f} ms  {res['avg_bytes']:7d} B  greške {res['errors']}")
+    await database.async_engine.dispose()
+    if database.HAS_REPLICA:
+        await database.async_replica_engine.dispose()
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def compare(results: dict, baseline_path: str, threshold: float) -> int:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = 0
+    print(f"\n>> poređenje sa {baseline_path} (prag {threshold:.0%} na p95)")
+    for name, res in results.items():
+        old = baseline.get(name)
+        if not old or not old["p95_ms"]:
+            continue
+        change = res["p95_ms"] / old["p95_ms"] - 1
+        flag = "REGRESIJA" if change > threshold else ""
+        regressions += bool(flag)
+        print(f"{name:22s} p95 {old['p95_ms']:8.2f} -> {res['p95_ms']:8.2f} ms  ({change:+.0%}) {flag}")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="p50/p95/p99 i propusnost za endpointe iz main.py")
+    parser.add_argument("--requests", type=int, default=1000, help="zahteva po scenariju (pomnoženo udelom)")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--only", nargs="*", choices=sorted(SCENARIOS), help="samo navedeni scenariji")
+    parser.add_argument("--writes", action="store_true", help="uključi scenarije koji menjaju podatke (reserve)")
+    parser.add_argument("--no-cache", action="store_true", help="bez keša javnih listinga")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="JSON rezultat (podrazumevano bench_results/bench_<vreme>.json)")
+    parser.add_argument("--baseline", default=None, help="prethodni JSON za poređenje")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    names = args.only or [n for n, s in SCENARIOS.items() if args.writes or not s[3]]
+    if args.no_cache:
+        main.bag_list_cache.maxsize = 0
+    ctx = load_context(random.Random(args.seed), sample=1000)
+    print(f">> {database.engine.dialect.name}, {ctx['n_bags']} kesa, {args.clients} klijenata, "
+          f"{args.requests} zahteva/scenario")
+    results = asyncio.run(run_all(names, ctx, args.requests, args.clients, args.warmup))
+
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    out = args.out or os.path.join("bench_results", f"bench_{stamp}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    meta = {
+        "timestamp": stamp, "commit": _git_commit(), "dialect": database.engine.dialect.name,
+        "bags": ctx["n_bags"], "requests": args.requests, "clients": args.clients, "seed": args.seed,
+        "cache": not args.no_cache, "python": platform.python_version(),
+    }
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2, ensure_ascii=False)
+    print(f">> rezultat: {out}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold)
+        if regressions and args.fail_on_regression:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,119 @@
+# bench_async.py
+# Poređenje propusnosti sync (threadpool) i async puta za javne read endpointe.
+#
+#   DATABASE_URL=postgresql+psycopg2://... python bench_async.py --clients 200 --requests 5000
+#   DATABASE_URL=sqlite:///./bench.db python bench_async.py --create-tables
+#
+# App se pokreće in-process (httpx.ASGITransport), tako da se meri samo server + baza.
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime
+
+import httpx
+from fastapi import Depends, HTTPException
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+import database
+import models
+import main
+
+database.engine.echo = False
+
+
+# Sync blizanac /public/bags/{bag_id} — isti upit kao pre prelaska na AsyncSession
+@main.app.get("/_bench/sync/bags/{bag_id}")
+def _bench_sync_bag_details(bag_id: int, db: Session = Depends(main.get_db)):
+    r = db.query(models.Bag).filter(models.Bag.id == bag_id).first()
+    if not r:
+        raise HTTPException(status_code=404, detail="Kesa nije pronađena.")
+    return {
+        "id": r.id, "naziv": r.naziv, "opis": r.opis, "cena": float(r.cena), "kolicina": r.kolicina,
+        "vreme_preuzimanja": r.vreme_preuzimanja, "status": r.status, "partner_id": r.partner_id,
+        "adresa": r.adresa, "lat": r.lat, "lng": r.lng, "thumbnail_url": r.thumbnail_url,
+        "created_at": r.created_at,
+    }
+
+
+def ensure_data(min_bags: int):
+    with database.SessionLocal() as db:
+        have = db.scalar(select(func.count(models.Bag.id)))
+        if have >= min_bags:
+            return [row[0] for row in db.execute(select(models.Bag.id).limit(min_bags))]
+        partner = models.Partner(naziv="Bench Pekara", lat=44.8125, lng=20.4612, is_active=True)
+        db.add(partner)
+        db.flush()
+        now = datetime.utcnow()
+        db.execute(insert(models.Bag), [
+            {
+                "naziv": f"Bench kesa {i}", "opis": "Miks peciva", "cena": 2.0 + i % 7, "kolicina": 5,
+                "status": "active", "partner_id": partner.id, "created_at": now,
+            }
+            for i in range(min_bags - have)
+        ])
+        db.commit()
+        return [row[0] for row in db.execute(select(models.Bag.id).limit(min_bags))]
+
+
+async def run(path_fmt: str, ids, clients: int, total: int):
+    transport = httpx.ASGITransport(app=main.app)
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker(client):
+        nonlocal errors
+        for _ in remaining:
+            t0 = time.perf_counter()
+            r = await client.get(path_fmt.format(bag_id=random.choice(ids)))
+            latencies.append(time.perf_counter() - t0)
+            if r.status_code != 200:
+                errors += 1
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100)
+    return {
+        "rps": total / elapsed,
+        "p50_ms": q[49] * 1000,
+        "p95_ms": q[94] * 1000,
+        "p99_ms": q[98] * 1000,
+        "errors": errors,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="sync vs async throughput za javne endpointe")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--bags", type=int, default=1000)
+    parser.add_argument("--create-tables", action="store_true", help="models.Base.metadata.create_all (lokalni SQLite)")
+    args = parser.parse_args()
+
+    if args.create_tables:
+        models.Base.metadata.create_all(bind=database.engine)
+    ids = ensure_data(args.bags)
+
+    print(f">> {args.requests} zahteva, {args.clients} konkurentnih klijenata, {len(ids)} kesa")
+    asyncio.run(compare(ids, args.clients, args.requests))
+
+
+async def compare(ids, clients: int, total: int):
+    # jedan event loop za sve: async pool veže konekcije za loop u kome su otvorene
+    for label, path in [("sync ", "/_bench/sync/bags/{bag_id}"), ("async", "/public/bags/{bag_id}")]:
+        await run(path, ids, 10, 100)  # zagrevanje pool-a
+        res = await run(path, ids, clients, total)
+        print(f"{label}  {res['rps']:8.1f} req/s   p50 {res['p50_ms']:7.1f} ms   "
+              f"p95 {res['p95_ms']:7.1f} ms   p99 {res['p99_ms']:7.1f} ms   greške {res['errors']}")
+    await database.async_engine.dispose()
+
+
+if __name__ == "__main__":
+    main_cli()
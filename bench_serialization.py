@@ -0,0 +1,98 @@
+# bench_serialization.py
+# Mikro-benchmark: cena po stavci za stranu od 200 kesa, pre i posle serializers.py.
+#   pre:   ORM entiteti -> ručni dict -> FastAPI jsonable_encoder -> json.dumps
+#   posle: projekcija kolona (Row) -> serializers.bag_to_dict -> orjson
+#
+#   python bench_serialization.py [--items 200] [--repeat 200]
+#
+# Koristi in-memory SQLite, pa meri samo mapiranje + serijalizaciju, ne mrežu do baze.
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+import models
+import serializers
+
+
+def setup(n: int):
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with Session(engine) as db:
+        partner = models.Partner(naziv="Bench Pekara", is_active=True)
+        db.add(partner)
+        db.flush()
+        db.execute(insert(models.Bag), [
+            {
+                "naziv": f"Kesa iznenađenja {i}",
+                "opis": "Miks peciva i hlebova koji su ostali od dana. " * 8,
+                "cena": 2.5 + i % 9, "kolicina": 1 + i % 5, "status": "active", "category": "pekara",
+                "vreme_preuzimanja": now + timedelta(hours=i % 6), "partner_id": partner.id,
+                "adresa": "Glavna 12, Beograd", "lat": 44.81 + i * 1e-4, "lng": 20.46,
+                "thumbnail_url": f"http://127.0.0.1:8000/static/uploads/{i:032x}.jpg", "created_at": now,
+            }
+            for i in range(n)
+        ])
+        db.commit()
+    return engine
+
+
+def before(db: Session, n: int) -> bytes:
+    rows = db.query(models.Bag).order_by(models.Bag.id.desc()).limit(n).all()
+    items = [
+        {
+            "id": r.id, "naziv": r.naziv, "opis": r.opis, "cena": float(r.cena), "kolicina": r.kolicina,
+            "vreme_preuzimanja": r.vreme_preuzimanja, "status": r.status, "category": r.category,
+            "partner_id": r.partner_id,
+            "adresa": r.adresa, "lat": r.lat, "lng": r.lng, "thumbnail_url": r.thumbnail_url,
+        }
+        for r in rows
+    ]
+    content = jsonable_encoder({"items": items, "total": n, "page": 1, "page_size": n})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def after(db: Session, n: int) -> bytes:
+    fields = serializers.BAG_PUBLIC_FIELDS
+    rows = db.execute(select(*serializers.bag_columns(fields)).order_by(models.Bag.id.desc()).limit(n))
+    items = [serializers.bag_to_dict(r, fields) for r in rows]
+    return serializers.dumps({"items": items, "total": n, "page": 1, "page_size": n})
+
+
+def measure(fn, engine, n: int, repeat: int) -> float:
+    with Session(engine) as db:
+        fn(db, n)  # zagrevanje
+        best = float("inf")
+        for _ in range(repeat):
+            db.expunge_all()  # bez identity-map prečice između ponavljanja
+            t0 = time.perf_counter()
+            fn(db, n)
+            best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cena serijalizacije strane kesa")
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = setup(args.items)
+    with Session(engine) as db:
+        assert json.loads(before(db, args.items)) == json.loads(after(db, args.items)), "različit JSON"
+
+    print(f">> strana od {args.items} kesa, najbolje od {args.repeat} ponavljanja")
+    t_before = measure(before, engine, args.items, args.repeat)
+    t_after = measure(after, engine, args.items, args.repeat)
+    for label, t in [("pre   (ORM + jsonable_encoder + json)", t_before), ("posle (kolone + orjson)", t_after)]:
+        print(f"{label:40s} {t * 1000:8.2f} ms/strana   {t / args.items * 1e6:7.1f} µs/stavka")
+    print(f"ubrzanje: {t_before / t_after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
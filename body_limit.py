@@ -0,0 +1,42 @@
+# body_limit.py
+# Ograničenje veličine tela zahteva dok se prima. Provera u handler-u dolazi tek pošto Starlette
+# spool-uje multipart telo na disk, a chunked zahtev bez Content-Length bi mogao da napiše
+# neograničen privremeni fajl.
+from typing import Dict
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+TOO_LARGE_DETAIL = "Zahtev je prevelik."
+
+
+class BodySizeLimitMiddleware:
+    """Čist ASGI middleware; limits = {putanja: najviše bajtova tela}."""
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = dict(limits)
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > limit:
+            await JSONResponse({"detail": TOO_LARGE_DETAIL}, status_code=413)(scope, receive, send)
+            return
+
+        received = [0]
+
+        async def receive_limited():
+            message = await receive()
+            if message["type"] == "http.request":
+                received[0] += len(message.get("body", b""))
+                if received[0] > limit:
+                    # FastAPI HTTPException iz parsiranja tela prosleđuje dalje -> 413 odgovor
+                    raise HTTPException(status_code=413, detail=TOO_LARGE_DETAIL)
+            return message
+
+        await self.app(scope, receive_limited, send)
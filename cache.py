@@ -0,0 +1,119 @@
+# cache.py
+# Read-through keš za javne listinge: in-process TTL + LRU, sa tagovima za preciznu invalidaciju.
+# CacheBackend je ugovor — deljeni store (npr. Redis) može se dodati kao nova implementacija.
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+MISSING = object()
+
+
+def make_key(namespace: str, params: Dict[str, Any]) -> str:
+    """Normalizovan ključ: None parametri se izostavljaju, redosled ne utiče."""
+    parts = [f"{k}={params[k]!r}" for k in sorted(params) if params[k] is not None]
+    return namespace + "?" + "&".join(parts)
+
+
+class CacheBackend:
+    def get(self, key: str) -> Any:
+        """Vraća vrednost ili MISSING."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = ()) -> None:
+        raise NotImplementedError
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Briše sve unose označene bilo kojim od tagova; vraća broj obrisanih."""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class MemoryTTLCache(CacheBackend):
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _drop(self, key: str) -> None:
+        _, _, tags = self._data.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = ()) -> None:
+        tags = frozenset(tags)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    if key in self._data:
+                        self._drop(key)
+                        removed += 1
+            self.invalidations += removed
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "entries": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+def make_cache(maxsize: int, ttl: float, backend: Optional[str] = "memory") -> CacheBackend:
+    if backend in (None, "", "memory"):
+        return MemoryTTLCache(maxsize=maxsize, ttl=ttl)
+    raise ValueError(f"Nepoznat cache backend: {backend}")
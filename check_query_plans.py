@@ -0,0 +1,222 @@
+# check_query_plans.py
+# Regresija planova izvršavanja: seed velikog skupa + EXPLAIN za vruće upite javnog i partner API-ja.
+# Izlazni kod != 0 ako neki upit radi sekvencijalni scan nad bags/partners ili korelisani podupit,
+# ili (gde je to označeno) sortira u memoriji umesto da čita redosled iz indeksa. Listinzi se
+# grade funkcijama iz bag_queries.py (kao u endpointima), za svaki sort ključ.
+#
+#   python check_query_plans.py                                           # privremeni SQLite fajl
+#   python check_query_plans.py --url postgresql+psycopg2://.../scratch --bags 200000 --verbose
+#
+# Šema se pravi iz models.py (indeksi u __table_args__ prate migracije 20261018_0009.._0012).
+# Seed ide samo u praznu bags tabelu — pokretati nad praznom/test bazom, ne nad produkcijom.
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, desc, func, insert, select, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+import bag_queries
+import database
+import geo
+import models
+import serializers
+import textsearch
+
+Bag = models.Bag
+Partner = models.Partner
+
+STATUSES = ["active"] * 3 + ["sold_out"] * 5 + ["expired"] * 2
+CATEGORIES = ["pekara", "restoran", "market", "kafic", "picerija", "susi", None]
+WORDS = ["kroasan", "burek", "hleb", "pica", "sendvič", "salata", "kolač", "pecivo", "sushi", "voće"]
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    prefix = "EXPLAIN QUERY PLAN " if compiler.dialect.name == "sqlite" else "EXPLAIN "
+    return prefix + compiler.process(element.stmt, **kw)
+
+
+def seed(engine, n_bags: int, n_partners: int) -> None:
+    rnd = random.Random(42)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        if conn.scalar(select(func.count()).select_from(Bag)):
+            print(">> bags nije prazna — preskačem seed")
+            return
+        first = conn.scalar(select(func.coalesce(func.max(Partner.id), 0))) + 1
+        conn.execute(insert(Partner), [
+            {"id": first + i, "naziv": f"Partner {i}", "email": f"p{i}@example.com",
+             "login_username": f"partner{i}", "is_active": True, "updated_at": now}
+            for i in range(n_partners)
+        ])
+        rows = []
+        for i in range(n_bags):
+            lat, lng = 44.8 + rnd.gauss(0, 0.3), 20.45 + rnd.gauss(0, 0.3)
+            naziv = f"{rnd.choice(WORDS).capitalize()} kesa {i}"
+            opis = " ".join(rnd.choice(WORDS) for _ in range(6))
+            rows.append({
+                "naziv": naziv, "opis": opis, "cena": round(rnd.uniform(1, 15), 2), "kolicina": rnd.randint(0, 5),
+                "status": rnd.choice(STATUSES), "category": rnd.choice(CATEGORIES), "partner_id": first + rnd.randrange(n_partners),
+                "vreme_preuzimanja": now + timedelta(minutes=rnd.randint(-60 * 12, 60 * 48)),
+                "lat": lat, "lng": lng, "geo_cell": geo.cell_for(lat, lng),
+                "search_norm": textsearch.document(naziv, opis),
+                "created_at": now - timedelta(minutes=rnd.randrange(60 * 24 * 90)), "updated_at": now,
+            })
+            if len(rows) == 5000:
+                conn.execute(insert(Bag), rows)
+                rows = []
+        if rows:
+            conn.execute(insert(Bag), rows)
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            textsearch.install_sqlite_fts(conn)
+        conn.execute(text("ANALYZE"))
+
+
+# vrednosti za "posle cursora" po sort ključu (tip mora da odgovara koloni)
+_AFTER = {
+    "id": 5000, "naziv": "Hleb kesa 5000", "cena": 5.0, "kolicina": 2, "vreme_preuzimanja": datetime(2030, 1, 1),
+    "status": "active", "category": "pekara", "created_at": datetime(2026, 1, 1), "distance": 1.5,
+}
+# cursor strane čiji redosled mora doći iz indeksa (NOT NULL kolona + parcijalni/partner indeks)
+_PUBLIC_INDEX_ORDERED = {"id", "cena", "created_at"}
+_PARTNER_INDEX_ORDERED = {"id"}
+
+
+def _listing_filters(sort_by: str) -> dict:
+    # relevance bez pretrage i distance bez radijusa su samo id sort — proverava se pravi oblik upita
+    if sort_by == "relevance":
+        return {"term": "kroasan"}
+    if sort_by == "distance":
+        return {"origin": (44.8, 20.45), "within_km": 3}
+    return {}
+
+
+def listing_queries(dialect: str):
+    """Svaki sort ključ kroz iste bag_queries funkcije kao /public/bags/page, /partner/bags/page i export."""
+    for sort_by in bag_queries.SORT_KEYS:
+        filters = _listing_filters(sort_by)
+        q, sort_col = bag_queries.public(dialect, sort_by=sort_by, **filters)
+        yield f"public: sort {sort_by}", bag_queries.public_page(q, sort_col, "desc", 3, 20), sort_by == "id"
+        if sort_by != "relevance":
+            after = {"value": _AFTER[sort_by], "id": 5000}
+            yield f"public: cursor, sort {sort_by}", \
+                bag_queries.public_page(q, sort_col, "desc", 1, 20, "", after), sort_by in _PUBLIC_INDEX_ORDERED
+    for sort_by in bag_queries.SORT_COLUMNS + ("relevance",):
+        term = "kroasan" if sort_by == "relevance" else None
+        extra = [bag_queries.sort_column(sort_by)] if sort_by != "relevance" else []
+        q, sort_col = bag_queries.partner(select(*serializers.bag_columns(extra=extra)), 7, term, sort_by, dialect)
+        yield f"partner: sort {sort_by}", bag_queries.page(q, sort_col, "desc", 3, 20), sort_by == "id"
+        if sort_by != "relevance":
+            after = {"value": _AFTER[sort_by], "id": 5000}
+            yield f"partner: cursor, sort {sort_by}", \
+                bag_queries.page(q, sort_col, "desc", 1, 20, "", after), sort_by in _PARTNER_INDEX_ORDERED
+        q, sort_col = bag_queries.partner(select(Bag.id, Bag.naziv, Bag.created_at), 7, term, sort_by, dialect)
+        yield f"partner: export, sort {sort_by}", bag_queries.ordered(q, sort_col, "desc"), False
+
+
+def hot_queries(dialect: str):
+    """(naziv, upit, očekuje redosled iz indeksa); listinzi se grade istim funkcijama kao u main.py."""
+    yield from listing_queries(dialect)
+    now = datetime.utcnow()
+    since = now - timedelta(days=7)
+    public, sort_col = bag_queries.public(dialect, min_price=2, max_price=4, sort_by="cena")
+    yield "public: price filter, sort cena", bag_queries.public_page(public, sort_col, "asc", 1, 20), False
+    public, sort_col = bag_queries.public(dialect, live_at=now)
+    yield "public: available_now", bag_queries.public_page(public, sort_col, "desc", 1, 20), False
+    public, sort_col = bag_queries.public(dialect, term="kroasan", origin=(44.8, 20.45), within_km=3, max_price=6)
+    yield "public: search + radius + price", bag_queries.public_page(public, sort_col, "desc", 1, 20), False
+    yield "public: count active", public.with_only_columns(func.count(Bag.id)), False
+    yield "public: category filter", bag_queries.public_page(
+        public.where(Bag.category.in_(["pekara", "kafic"])), sort_col, "desc", 1, 20), False
+    facet = public.with_only_columns(Bag.category, Bag.cena).subquery()
+    yield "public: facets", \
+        select(facet.c.category, func.count()).group_by(facet.c.category), False
+    grid = select(geo.grid_index(Bag.lat, 90.0, 0.1, dialect).label("gy"), geo.grid_index(Bag.lng, 180.0, 0.1, dialect)
+                  .label("gx"), Bag.lat, Bag.lng, Bag.cena) \
+        .where(models.bag_is_active(), Bag.lat.between(44.6, 45.0), Bag.lng.between(20.2, 20.7)).subquery()
+    yield "public: map clusters", \
+        select(grid.c.gy, grid.c.gx, func.count(), func.min(grid.c.cena)).group_by(grid.c.gy, grid.c.gx), False
+    yield "expiry: overdue batch", \
+        select(Bag.id).where(models.bag_is_active(), Bag.vreme_preuzimanja < now) \
+        .order_by(Bag.vreme_preuzimanja, Bag.id).limit(1000), True
+    yield "public: bag detail", select(*serializers.bag_columns()).where(Bag.id == 1234), False
+    yield "partner: count", select(func.count(Bag.id)).where(Bag.partner_id == 7), False
+    yield "partner: export date range", \
+        select(Bag.id, Bag.naziv).where(Bag.partner_id == 7, Bag.created_at >= since).order_by(desc(Bag.id)), False
+    yield "partner: counts by status", \
+        select(Bag.partner_id, Bag.status, func.count(Bag.id)).where(Bag.partner_id.in_([7, 8])) \
+        .group_by(Bag.partner_id, Bag.status), False
+    yield "auth: partner by email", select(Partner.id).where(Partner.email == "p7@example.com"), False
+    yield "auth: partner by username", select(Partner.id).where(Partner.login_username == "partner7"), False
+    yield "counters: read", select(models.PartnerBagCounter.status).where(models.PartnerBagCounter.partner_id == 7), False
+
+
+_SEQ_SCAN = {
+    "sqlite": re.compile(r"^SCAN (bags|partners)\b(?!.*USING (COVERING )?INDEX)"),
+    "postgresql": re.compile(r"Seq Scan on (bags|partners)\b"),
+}
+# korelisani podupit se izvršava po redu (npr. bm25 MATCH za svaku kesu) — nikad u vrućem upitu
+_CORRELATED = {
+    "sqlite": re.compile(r"CORRELATED (SCALAR|LIST) SUBQUERY"),
+    "postgresql": re.compile(r"\bSubPlan\b"),
+}
+_SORT = {
+    "sqlite": re.compile(r"USE TEMP B-TREE FOR ORDER BY"),
+    "postgresql": re.compile(r"\bSort\b"),
+}
+
+
+def explain(conn, stmt):
+    rows = conn.execute(Explain(stmt)).all()
+    return [r[-1] for r in rows]  # SQLite: (id, parent, notused, detail); Postgres: (line,)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN regresija za vruće upite")
+    parser.add_argument("--url", default=os.getenv("PLAN_CHECK_DATABASE_URL"))
+    parser.add_argument("--bags", type=int, default=50000)
+    parser.add_argument("--partners", type=int, default=500)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "plans.db")
+    engine = create_engine(url)
+    database.install_sqlite_functions(engine)  # haversine_km za radius upite
+    models.Base.metadata.create_all(engine)
+    print(f">> {engine.dialect.name}: seed {args.bags} kesa / {args.partners} partnera")
+    seed(engine, args.bags, args.partners)
+
+    dialect = engine.dialect.name
+    seq_scan, correlated, sort = _SEQ_SCAN[dialect], _CORRELATED[dialect], _SORT[dialect]
+    failures = 0
+    with engine.connect() as conn:
+        for name, stmt, ordered in hot_queries(dialect):
+            plan = explain(conn, stmt)
+            problems = [line.strip() for line in plan if seq_scan.search(line.strip()) or correlated.search(line)]
+            if ordered:
+                problems += [line.strip() for line in plan if sort.search(line)]
+            status = "FAIL" if problems else "ok"
+            failures += bool(problems)
+            print(f"{status:4s}  {name}")
+            for line in (plan if args.verbose or problems else []):
+                print(f"        {line}")
+    print(f">> {failures} upita bez odgovarajućeg indeksa" if failures else ">> svi upiti koriste indekse")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# conditional.py
+# Uslovni GET: slabi ETag-ovi iz verzije podataka, 304 pre ikakve serijalizacije.
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+# klijent uvek revalidira, ali uz If-None-Match dobija prazan 304
+CACHE_CONTROL = "no-cache"
+
+
+def weak_etag(*parts) -> str:
+    digest = hashlib.blake2b("|".join(str(p) for p in parts).encode("utf-8"), digest_size=10).hexdigest()
+    return f'W/"{digest}"'
+
+
+def content_etag(body: bytes) -> str:
+    """Jaki ETag iz samog tela: isti sadržaj daje isti tag na svim worker-ima i CDN-u."""
+    return '"' + hashlib.blake2b(body, digest_size=10).hexdigest() + '"'
+
+
+def headers(etag: str, last_modified: Optional[datetime] = None, cache_control: str = CACHE_CONTROL) -> Dict[str, str]:
+    out = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        out["Last-Modified"] = format_datetime(last_modified.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True)
+    return out
+
+
+def _strip_weak(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_fresh(request_headers: Headers, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """If-None-Match (slabo poređenje) ima prednost nad If-Modified-Since."""
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return _strip_weak(etag) in {_strip_weak(t) for t in if_none_match.split(",")}
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None, cache_control: str = CACHE_CONTROL) -> Response:
+    return Response(status_code=304, headers=headers(etag, last_modified, cache_control))
@@ -0,0 +1,78 @@
+# counters.py
+# Održavani brojači kesa po (partner, status): badge na dashboard-u je O(1) čitanje.
+# apply_deltas() se zove pre commit-a, u istoj transakciji kao i sam upis u bags.
+from collections import Counter
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import models
+
+Deltas = Dict[Tuple[int, str], int]
+_UPSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+def transition(deltas: Counter, partner_id: int, old_status, new_status, n: int = 1) -> Counter:
+    """Dodaje promenu statusa (None = kesa ne postoji pre/posle upisa)."""
+    if old_status == new_status:
+        return deltas
+    if old_status is not None:
+        deltas[(partner_id, old_status)] -= n
+    if new_status is not None:
+        deltas[(partner_id, new_status)] += n
+    return deltas
+
+
+def apply_deltas(db, deltas: Deltas) -> None:
+    table = models.PartnerBagCounter.__table__
+    upsert = _UPSERTS.get(db.get_bind().dialect.name)
+    for (partner_id, status), delta in deltas.items():
+        if not delta:
+            continue
+        if upsert is not None:
+            stmt = upsert(table).values(partner_id=partner_id, status=status, count=delta)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c.partner_id, table.c.status],
+                set_={"count": table.c.count + delta},
+            ))
+            continue
+        res = db.execute(
+            update(table)
+            .where(table.c.partner_id == partner_id, table.c.status == status)
+            .values(count=table.c.count + delta)
+        )
+        if res.rowcount == 0:
+            db.execute(insert(table).values(partner_id=partner_id, status=status, count=delta))
+
+
+def read(db, partner_id: int) -> Dict[str, int]:
+    table = models.PartnerBagCounter.__table__
+    rows = db.execute(select(table.c.status, table.c.count).where(table.c.partner_id == partner_id))
+    return {status: count for status, count in rows}
+
+
+def group_by_status(db, partner_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+    """Jedan GROUP BY upit nad bags — tačni brojevi za sve statuse, i buduće."""
+    out: Dict[int, Dict[str, int]] = {}
+    rows = db.execute(
+        select(models.Bag.partner_id, models.Bag.status, func.count(models.Bag.id))
+        .where(models.Bag.partner_id.in_(list(partner_ids)))
+        .group_by(models.Bag.partner_id, models.Bag.status)
+    )
+    for partner_id, status, count in rows:
+        out.setdefault(partner_id, {})[status] = count
+    return out
+
+
+def recount(db, partner_id: int) -> Dict[str, int]:
+    """Ponovo gradi brojače partnera iz bags (posle migracije ili ako se sumnja na drift)."""
+    exact = group_by_status(db, [partner_id]).get(partner_id, {})
+    table = models.PartnerBagCounter.__table__
+    db.execute(delete(table).where(table.c.partner_id == partner_id))
+    if exact:
+        db.execute(insert(table), [
+            {"partner_id": partner_id, "status": status, "count": count} for status, count in exact.items()
+        ])
+    return exact
@@ -0,0 +1,92 @@
+# expiry.py
+# Pozadinsko isticanje kesa: aktivne kese kojima je prošao termin preuzimanja prelaze u "expired".
+# Svaka serija je jedna kratka transakcija: UPDATE ... WHERE id IN (SELECT ... LIMIT n) RETURNING,
+# brojači po partneru u istoj transakciji, data_versions posle commit-a (versions.mark). Kandidati se nalaze preko parcijalnog
+# indeksa ix_bags_active_pickup_id (vreme_preuzimanja, id) WHERE status = 'active'.
+#
+# Više worker-a može da pokreće sweeper istovremeno: na Postgresu SKIP LOCKED deli kandidate,
+# a uslov status = 'active' u samom UPDATE-u sprečava dvostruko brojanje.
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, List, Optional
+
+from sqlalchemy import select, update
+
+import counters
+import models
+import versions
+
+log = logging.getLogger(__name__)
+
+EXPIRY_ENABLED = os.getenv("EXPIRY_SWEEPER", "1").lower() not in ("0", "false", "no")
+EXPIRY_INTERVAL_S = float(os.getenv("EXPIRY_INTERVAL_S", "60"))
+EXPIRY_BATCH_SIZE = int(os.getenv("EXPIRY_BATCH_SIZE", "1000"))
+EXPIRY_MAX_BATCHES = int(os.getenv("EXPIRY_MAX_BATCHES", "100"))  # po prolazu; ostatak u sledećem
+
+EXPIRED = "expired"
+
+
+def expire_batch(db, now: datetime, batch_size: int = EXPIRY_BATCH_SIZE) -> List[Any]:
+    """Jedna serija u transakciji sesije db (commit radi pozivalac); vraća redove (id, partner_id, lat, lng)."""
+    bag = models.Bag
+    overdue = (
+        select(bag.id)
+        .where(models.bag_is_active(), bag.vreme_preuzimanja < now)
+        .order_by(bag.vreme_preuzimanja, bag.id)
+        .limit(batch_size)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        overdue = overdue.with_for_update(skip_locked=True)
+    rows = db.execute(
+        update(bag)
+        .where(bag.id.in_(overdue.scalar_subquery()), bag.status == "active")
+        .values(status=EXPIRED)
+        .returning(bag.id, bag.partner_id, bag.lat, bag.lng)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not rows:
+        return []
+    deltas = Counter()
+    for partner_id, n in Counter(r.partner_id for r in rows).items():
+        counters.transition(deltas, partner_id, "active", EXPIRED, n)
+    counters.apply_deltas(db, deltas)
+    versions.mark(db, versions.BAGS)
+    return rows
+
+
+def sweep(session_factory, now: Optional[datetime] = None, batch_size: int = EXPIRY_BATCH_SIZE,
+          max_batches: int = EXPIRY_MAX_BATCHES,
+          on_expired: Optional[Callable[[List[Any]], None]] = None) -> int:
+    """Ističe zaostale kese u serijama; on_expired(redovi) se zove posle svakog commit-a."""
+    now = now or datetime.utcnow()
+    total = 0
+    for _ in range(max_batches):
+        with session_factory() as db:
+            rows = expire_batch(db, now, batch_size)
+            db.commit()
+        if not rows:
+            break
+        total += len(rows)
+        if on_expired is not None:
+            on_expired(rows)
+        if len(rows) < batch_size:
+            break
+    if total:
+        log.info("Isteklo %s kesa (termin pre %s)", total, now.isoformat(timespec="seconds"))
+    return total
+
+
+async def run_forever(session_factory, on_expired=None, interval: float = EXPIRY_INTERVAL_S) -> None:
+    """Petlja za lifespan: sweep u threadpool-u (sync sesija), pa pauza; otkazuje se na gašenju."""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, lambda: sweep(session_factory, on_expired=on_expired))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("Expiry sweep nije uspeo; novi pokušaj za %.0f s", interval)
+        await asyncio.sleep(interval)
@@ -0,0 +1,231 @@
+# generate_data.py
+# Brzi generator realističnih podataka za benchmark: partneri grupisani oko gradova, kese sa
+# različitim statusima i terminima preuzimanja. Deterministički (--seed), pa su rezultati uporedivi.
+#
+#   DATABASE_URL=sqlite:///./bench.db python generate_data.py --create-tables --bags 1000000
+#   DATABASE_URL=postgresql+psycopg2://... python generate_data.py --bags 2000000 --partners 5000
+#
+# Postgres: COPY FROM STDIN po serijama; SQLite: executemany u jednoj transakciji, FTS indeks se
+# gradi jednom na kraju. Posle upisa: brojači po partneru, data_versions, ANALYZE.
+# Svi generisani partneri imaju lozinku GEN_PASSWORD (login: gen<broj>).
+import argparse
+import csv
+import functools
+import hashlib
+import io
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+import database
+import geo
+import models
+import textsearch
+import versions
+
+GEN_PASSWORD = "tajna"
+
+# (grad, lat, lng, težina)
+CITIES = [
+    ("Beograd", 44.8125, 20.4612, 40),
+    ("Novi Sad", 45.2671, 19.8335, 15),
+    ("Niš", 43.3209, 21.8958, 10),
+    ("Kragujevac", 44.0128, 20.9114, 6),
+    ("Subotica", 46.1003, 19.6658, 5),
+    ("Zagreb", 45.8150, 15.9819, 10),
+    ("Ljubljana", 46.0569, 14.5058, 6),
+    ("Antwerpen", 51.2194, 4.4025, 8),
+]
+PARTNER_KINDS = ["Pekara", "Poslastičarnica", "Restoran", "Market", "Kafić", "Picerija", "Suši bar", "Piljara"]
+# vrsta partnera -> bags.category (normalizovano kao schemas.normalize_category)
+CATEGORIES = {
+    "Pekara": "pekara", "Poslastičarnica": "poslasticarnica", "Restoran": "restoran", "Market": "market",
+    "Kafić": "kafic", "Picerija": "picerija", "Suši bar": "susi", "Piljara": "voce_povrce",
+}
+BAG_NAMES = {
+    "Pekara": ["Pekarska kesa iznenađenja", "Kesa peciva", "Hleb i kifle"],
+    "Poslastičarnica": ["Slatka kesa", "Kolači dana", "Torte i kolači"],
+    "Restoran": ["Obrok iznenađenja", "Dnevni meni", "Kesa od ručka"],
+    "Market": ["Voće i povrće", "Mlečni proizvodi", "Kesa namirnica"],
+    "Kafić": ["Sendviči i kroasani", "Kafa + kolač", "Doručak kesa"],
+    "Picerija": ["Parčići pice", "Pica iznenađenja"],
+    "Suši bar": ["Suši kutija", "Roll miks"],
+    "Piljara": ["Sezonsko voće", "Kesa povrća"],
+}
+OPISI = [
+    "Miks proizvoda koji su ostali od dana.",
+    "Sveže, ali mora danas. Sadržaj se menja svakog dana.",
+    "Čokoladni kroasani, burek i pogačice.",
+    "Idealno za porodicu — dovoljno za dva obroka.",
+    "Vegetarijanski izbor, bez glutena na upit.",
+]
+# status -> težina; "stale" = aktivna kesa kojoj je termin preuzimanja prošao (za sweeper)
+STATUS_WEIGHTS = [("active", 50), ("sold_out", 25), ("expired", 15), ("paused", 5), ("stale", 5)]
+
+BAG_COLUMNS = [
+    "naziv", "opis", "cena", "kolicina", "vreme_preuzimanja", "status", "category", "partner_id", "adresa",
+    "lat", "lng", "thumbnail_url", "created_at", "updated_at", "geo_cell", "search_norm",
+]
+
+
+@functools.lru_cache(maxsize=None)
+def _document(naziv: str, opis: str) -> str:
+    return textsearch.document(naziv, opis)
+
+
+def make_partners(rnd: random.Random, n: int, now: datetime):
+    """Lista (red za insert, vrsta partnera)."""
+    weights = [c[3] for c in CITIES]
+    password_hash = hashlib.sha256(GEN_PASSWORD.encode("utf-8")).hexdigest()
+    rows = []
+    for i in range(n):
+        city, clat, clng, _ = rnd.choices(CITIES, weights)[0]
+        kind = rnd.choice(PARTNER_KINDS)
+        rows.append(({
+            "naziv": f"{kind} {city} {i}", "adresa": f"Ulica {rnd.randint(1, 200)}, {city}",
+            "lat": round(clat + rnd.gauss(0, 0.03), 6), "lng": round(clng + rnd.gauss(0, 0.04), 6),
+            "email": f"gen{i}@example.com", "login_username": f"gen{i}", "password_hash": password_hash,
+            "is_active": rnd.random() > 0.02, "updated_at": now,
+        }, kind))
+    return rows
+
+
+def make_bags(rnd: random.Random, n: int, partners, now: datetime):
+    # rnd.random() umesto choice/randrange/choices: isti raspored, ~2x brže za milione redova
+    r = rnd.random
+    status_table = [s for s, w in STATUS_WEIGHTS for _ in range(w)]
+    n_status, n_partners = len(status_table), len(partners)
+    minute = timedelta(minutes=1)
+    now = now.replace(second=0)
+    for _ in range(n):
+        pid, plat, plng, padresa, kind = partners[int(r() * n_partners)]
+        status = status_table[int(r() * n_status)]
+        created = now - int(r() * 60 * 24 * 60) * minute
+        if status == "active":
+            pickup = now + (30 + int(r() * 60 * 48)) * minute
+        elif status == "stale":
+            status, pickup = "active", now - (10 + int(r() * 60 * 24 * 5)) * minute
+        else:
+            pickup = created + (120 + int(r() * 60 * 28)) * minute
+        names = BAG_NAMES[kind]
+        naziv = names[int(r() * len(names))]
+        opis = OPISI[int(r() * len(OPISI))]
+        lat, lng = plat + (r() - 0.5) * 0.002, plng + (r() - 0.5) * 0.002
+        yield (
+            naziv, opis, round(1.5 + r() * 10.5, 2), 0 if status == "sold_out" else 1 + int(r() * 6),
+            pickup, status, CATEGORIES[kind], pid, padresa, lat, lng, None,
+            created, created, geo.cell_for(lat, lng), _document(naziv, opis),
+        )
+
+
+def _load_sqlite(conn, rows, batch: int) -> None:
+    cursor = conn.connection.dbapi_connection.cursor()
+    sql = f"INSERT INTO bags ({', '.join(BAG_COLUMNS)}) VALUES ({', '.join('?' * len(BAG_COLUMNS))})"
+    chunk = []
+    for row in rows:
+        # isti tekstualni format kao SQLAlchemy DateTime na SQLite-u
+        chunk.append(tuple(v.isoformat(" ", "microseconds") if isinstance(v, datetime) else v for v in row))
+        if len(chunk) == batch:
+            cursor.executemany(sql, chunk)
+            chunk = []
+    if chunk:
+        cursor.executemany(sql, chunk)
+
+
+def _load_postgres(conn, rows, batch: int) -> None:
+    cursor = conn.connection.dbapi_connection.cursor()
+    copy_sql = f"COPY bags ({', '.join(BAG_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '')"
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    n = 0
+    for row in rows:
+        writer.writerow(["" if v is None else v.isoformat() if isinstance(v, datetime) else v for v in row])
+        n += 1
+        if n % batch == 0:
+            buf.seek(0)
+            cursor.copy_expert(copy_sql, buf)
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        buf.seek(0)
+        cursor.copy_expert(copy_sql, buf)
+
+
+def _load_generic(conn, rows, batch: int) -> None:
+    chunk = []
+    for row in rows:
+        chunk.append(dict(zip(BAG_COLUMNS, row)))
+        if len(chunk) == batch:
+            conn.execute(insert(models.Bag.__table__), chunk)
+            chunk = []
+    if chunk:
+        conn.execute(insert(models.Bag.__table__), chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bulk generator partnera i kesa")
+    parser.add_argument("--partners", type=int, default=2000)
+    parser.add_argument("--bags", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--create-tables", action="store_true", help="models.Base.metadata.create_all")
+    parser.add_argument("--keep-indexes", action="store_true", help="ne uklanjati indekse tokom upisa")
+    args = parser.parse_args()
+
+    engine = database.engine
+    dialect = engine.dialect.name
+    if args.create_tables:
+        models.Base.metadata.create_all(bind=engine)
+    rnd = random.Random(args.seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    started = time.perf_counter()
+
+    with engine.begin() as conn:
+        table = models.Partner.__table__
+        generated = make_partners(rnd, args.partners, now)
+        ids = conn.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True), [row for row, _ in generated]
+        ).scalars().all()
+        partners = [(pid, row["lat"], row["lng"], row["adresa"], kind) for pid, (row, kind) in zip(ids, generated)]
+        print(f">> {len(partners)} partnera ({time.perf_counter() - started:.1f} s)")
+
+        # sekundarni indeksi iz models.py se grade jednom posle upisa (sortirano), ne red po red
+        bag_indexes = [] if args.keep_indexes else list(models.Bag.__table__.indexes)
+        for index in bag_indexes:
+            index.drop(conn, checkfirst=True)
+        if dialect == "sqlite":
+            # isto važi i za FTS trigere
+            for trigger in ("bags_fts_ai", "bags_fts_ad", "bags_fts_au"):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+            conn.execute(text("DROP TABLE IF EXISTS bags_fts"))
+            _load_sqlite(conn, make_bags(rnd, args.bags, partners, now), args.batch)
+        elif dialect == "postgresql":
+            _load_postgres(conn, make_bags(rnd, args.bags, partners, now), args.batch)
+        else:
+            _load_generic(conn, make_bags(rnd, args.bags, partners, now), args.batch)
+        print(f">> {args.bags} kesa ({time.perf_counter() - started:.1f} s)")
+        for index in bag_indexes:
+            index.create(conn, checkfirst=True)
+        print(f">> indeksi ({time.perf_counter() - started:.1f} s)")
+
+        conn.execute(text("DELETE FROM partner_bag_counters"))
+        conn.execute(text(
+            "INSERT INTO partner_bag_counters (partner_id, status, count) "
+            "SELECT partner_id, status, COUNT(*) FROM bags GROUP BY partner_id, status"
+        ))
+        versions.bump(conn, versions.BAGS, versions.PARTNERS)
+        if dialect == "sqlite":
+            textsearch.install_sqlite_fts(conn)
+
+    with engine.connect() as conn:
+        if dialect == "sqlite":
+            conn.execute(text("PRAGMA analysis_limit = 2000"))  # uzorak umesto punog prolaza
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+    print(f">> gotovo za {time.perf_counter() - started:.1f} s (brojači, FTS, ANALYZE uključeni)")
+
+
+if __name__ == "__main__":
+    main()
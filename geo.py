@@ -0,0 +1,130 @@
+# geo.py
+# Geo pomoćne funkcije: grid ćelije (prostorni indeks na bags.geo_cell) + haversine.
+import math
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Integer, cast, func
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Veličina ćelije u stepenima (~5.5 km po geografskoj širini).
+# Menjanje zahteva ponovno popunjavanje bags.geo_cell (vidi migraciju 20261018_0004).
+GEO_CELL_DEG = 0.05
+
+# Iznad ovog broja ćelija IN lista postaje skuplja od običnog bounding box-a.
+MAX_PREFILTER_CELLS = 600
+
+_LAT_CELLS = int(round(180 / GEO_CELL_DEG))
+_LNG_CELLS = int(round(360 / GEO_CELL_DEG))
+
+
+def _cell_indexes(lat: float, lng: float) -> Tuple[int, int]:
+    iy = min(_LAT_CELLS - 1, max(0, int(math.floor((lat + 90.0) / GEO_CELL_DEG))))
+    ix = int(math.floor((lng + 180.0) / GEO_CELL_DEG)) % _LNG_CELLS
+    return iy, ix
+
+
+def cell_for(lat: Optional[float], lng: Optional[float]) -> Optional[str]:
+    """Ključ grid ćelije za tačku, ili None ako kesa nema koordinate."""
+    if lat is None or lng is None:
+        return None
+    iy, ix = _cell_indexes(lat, lng)
+    return f"{iy}:{ix}"
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lng, max_lng) koji sigurno sadrži krug radius_km oko tačke."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6 or dlat >= 90:
+        return max(-90.0, lat - dlat), min(90.0, lat + dlat), -180.0, 180.0
+    dlng = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return max(-90.0, lat - dlat), min(90.0, lat + dlat), lng - dlng, lng + dlng
+
+
+def cells_covering(lat: float, lng: float, radius_km: float) -> Optional[List[str]]:
+    """Sve ćelije koje seku bounding box kruga; None ako ih ima previše za IN listu."""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    y0, x0 = _cell_indexes(min_lat, min_lng)
+    y1, _ = _cell_indexes(max_lat, min_lng)
+    x_span = int(math.floor((max_lng + 180.0) / GEO_CELL_DEG)) - int(math.floor((min_lng + 180.0) / GEO_CELL_DEG))
+    x_span = min(x_span, _LNG_CELLS - 1)
+    if (y1 - y0 + 1) * (x_span + 1) > MAX_PREFILTER_CELLS:
+        return None
+    return [
+        f"{iy}:{(x0 + dx) % _LNG_CELLS}"
+        for iy in range(y0, y1 + 1)
+        for dx in range(x_span + 1)
+    ]
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _haversine_sql(lat1, lng1, lat2, lng2):
+    # SQLite funkcija (vidi install_sqlite_functions); kese bez koordinata -> NULL
+    if None in (lat1, lng1, lat2, lng2):
+        return None
+    return haversine_km(lat1, lng1, lat2, lng2)
+
+
+def install_sqlite_functions(dbapi_connection) -> None:
+    """haversine_km(lat1, lng1, lat2, lng2) u SQLite-u (bez math ekstenzije); poziva se na svakoj konekciji."""
+    dbapi_connection.create_function("haversine_km", 4, _haversine_sql, deterministic=True)
+
+
+def distance_km(model, lat: float, lng: float, dialect: str):
+    """Haversine udaljenost od (lat, lng) u SQL-u, za filter i ORDER BY posle prefilter-a."""
+    if dialect == "sqlite":
+        return func.haversine_km(lat, lng, model.lat, model.lng)
+    p1, p2 = math.radians(lat), func.radians(model.lat)
+    a = (func.power(func.sin((p2 - p1) * 0.5), 2)
+         + math.cos(p1) * func.cos(p2) * func.power(func.sin(func.radians(model.lng - lng) * 0.5), 2))
+    return 2 * EARTH_RADIUS_KM * func.asin(func.least(1.0, func.sqrt(a)))
+
+
+def prefilter(q, model, lat: float, lng: float, radius_km: float):
+    """Sužava upit na kandidate iz ćelija + bounding box-a; tačan filter radi distance_km."""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    cells = cells_covering(lat, lng, radius_km)
+    if cells is not None:
+        q = q.filter(model.geo_cell.in_(cells))
+    q = q.filter(model.lat.between(min_lat, max_lat))
+    if min_lng >= -180.0 and max_lng <= 180.0:
+        q = q.filter(model.lng.between(min_lng, max_lng))
+    return q
+
+
+# -----------------------------------------------------------------------------
+# Klasteri za mapu: kvadratna mreža u stepenima, vezana za (-90, -180) pa je stabilna pri pomeranju
+# -----------------------------------------------------------------------------
+CLUSTER_CELL_PX = 64  # ~ prečnik markera na ekranu; pločica od 256 px = 4x4 ćelije
+
+
+def parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    """"min_lng,min_lat,max_lng,max_lat" (redosled kao GeoJSON / Leaflet toBBoxString)."""
+    try:
+        west, south, east, north = (float(v) for v in value.split(","))
+    except ValueError:
+        raise ValueError("bbox mora biti min_lng,min_lat,max_lng,max_lat.")
+    if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+        raise ValueError("Neispravan bbox (preko 180. meridijana poslati dva upita).")
+    return west, south, east, north
+
+
+def cluster_cell_deg(zoom: int) -> float:
+    return 360.0 / (2 ** zoom) * CLUSTER_CELL_PX / 256
+
+
+def grid_index(col, offset: float, cell_deg: float, dialect: str):
+    """floor((col + offset) / cell_deg) u SQL-u; offset drži vrednost >= 0, pa je na SQLite-u
+    CAST (odsecanje) isto što i floor (bez math ekstenzije). Postgres CAST zaokružuje -> floor()."""
+    scaled = (col + offset) / cell_deg
+    if dialect == "sqlite":
+        return cast(scaled, Integer)
+    return cast(func.floor(scaled), Integer)
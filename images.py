@@ -0,0 +1,119 @@
+# images.py
+# Varijante upload-ovanih slika (thumb/card/full, AVIF kad ga Pillow podržava + WebP + JPEG) u process pool-u.
+# Imena su izvedena iz SHA-256 sadržaja: <sha256>_<varijanta>.<format>, pa su fajlovi nepromenljivi.
+import logging
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow je opcioni — bez njega se čuva samo original
+    Image = None
+    ImageOps = None
+    features = None
+
+log = logging.getLogger(__name__)
+
+# najduža stranica u pikselima
+VARIANTS = {"thumb": 320, "card": 800, "full": 1600}
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+# AVIF samo ako je Pillow izgrađen sa libavif; inače ga /static ni ne nalazi pa pregovara WebP
+if features is not None and features.check("avif"):
+    FORMATS["avif"] = ("AVIF", {"quality": 55, "speed": 6})
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+# samo ovi upload-i dobijaju varijante; ostali fajlovi se čuvaju kao original
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+IMAGE_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def available() -> bool:
+    return Image is not None
+
+
+def variant_name(digest: str, variant: str, fmt: str) -> str:
+    return f"{digest}_{variant}.{fmt}"
+
+
+def variant_names(digest: str) -> Dict[str, Dict[str, str]]:
+    return {v: {fmt: variant_name(digest, v, fmt) for fmt in FORMATS} for v in VARIANTS}
+
+
+def variants_exist(out_dir: str, digest: str) -> bool:
+    return all(os.path.exists(os.path.join(out_dir, name))
+               for by_fmt in variant_names(digest).values() for name in by_fmt.values())
+
+
+def is_image(path: str, ext: str, content_type: Optional[str] = None) -> bool:
+    """Ekstenzija i Content-Type sa whitelist-e, pa Image.verify() (struktura fajla, bez dekodiranja piksela)."""
+    if not available() or ext not in IMAGE_EXTENSIONS:
+        return False
+    if content_type and not content_type.startswith("image/"):
+        return False
+    try:
+        with Image.open(path) as im:
+            if im.format not in IMAGE_FORMATS:
+                return False
+            im.verify()
+    except Exception:  # Pillow diže razne izuzetke za oštećene/nepoznate fajlove
+        return False
+    return True
+
+
+def generate_variants(src_path: str, out_dir: str, digest: str) -> List[str]:
+    """Radi u zasebnom procesu. Piše preko privremenog fajla + os.replace (atomski)."""
+    written = []
+    with Image.open(src_path) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+        for variant, max_side in VARIANTS.items():
+            resized = im.copy()
+            resized.thumbnail((max_side, max_side), Image.LANCZOS)
+            for fmt, (pil_format, options) in FORMATS.items():
+                name = variant_name(digest, variant, fmt)
+                dst = os.path.join(out_dir, name)
+                if os.path.exists(dst):
+                    continue
+                tmp = os.path.join(out_dir, f".tmp-{uuid.uuid4().hex}.{fmt}")
+                resized.save(tmp, pil_format, **options)
+                os.replace(tmp, dst)
+                written.append(name)
+    return written
+
+
+def _pool_instance() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _pool
+
+
+def _log_failure(future) -> None:
+    exc = future.exception()
+    if exc is not None:
+        log.warning("Generisanje varijanti slike nije uspelo: %s", exc)
+
+
+def schedule_variants(src_path: str, out_dir: str, digest: str) -> bool:
+    """Pokreće generisanje u pozadini; False ako Pillow nije instaliran ili varijante već postoje."""
+    if not available():
+        return False
+    if variants_exist(out_dir, digest):
+        return False
+    _pool_instance().submit(generate_variants, src_path, out_dir, digest).add_done_callback(_log_failure)
+    return True
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
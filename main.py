@@ -1,28 +1,61 @@
 # main.py
-from datetime import datetime, timedelta
+from collections import Counter
+from contextlib import asynccontextmanager, suppress
+from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Any, Dict
 import os
 import io
+import asyncio
 import csv
+import json
+import zlib
 import hashlib
+import hmac
 import uuid
+import time
 
-from fastapi import FastAPI, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, status, Query, UploadFile, File, Header, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.responses import StreamingResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from jose import jwt, JWTError
 from sqlalchemy.orm import Session
-from sqlalchemy import func, asc, desc, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import func, asc, desc, select, text, update, case, insert, bindparam, delete, cast, Integer
 
-import models, schemas
-from database import SessionLocal
+import models, schemas, geo, pagination, cache, textsearch, counters, serializers, images, versions, conditional, metrics
+import expiry, realtime, tiles, body_limit, bag_queries
+from serializers import FastJSONResponse, RawJSONResponse
+from static_files import UploadStaticFiles
+import database
+from database import engine, async_engine, SessionLocal, AsyncSessionLocal, ReplicaSessionLocal, AsyncReplicaSessionLocal
 
 # -----------------------------------------------------------------------------
 # App & CORS
 # -----------------------------------------------------------------------------
-app = FastAPI(title="Snalazljivko API")
+DB_DIALECT = engine.dialect.name
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_DIALECT == "sqlite":
+        # lokalni razvoj: FTS5 indeks za pretragu (na Postgresu ga pravi migracija)
+        with engine.begin() as conn:
+            textsearch.install_sqlite_fts(conn)
+    realtime.hub.bind(asyncio.get_running_loop())
+    # zaostale aktivne kese (prošao termin preuzimanja) -> "expired", periodično u serijama
+    sweeper = None
+    if expiry.EXPIRY_ENABLED and BagModel is not None:
+        sweeper = asyncio.create_task(expiry.run_forever(SessionLocal, on_expired=_bags_expired))
+    yield
+    if sweeper is not None:
+        sweeper.cancel()
+        with suppress(asyncio.CancelledError):
+            await sweeper
+    images.shutdown_pool()
+
+app = FastAPI(title="Snalazljivko API", lifespan=lifespan)
 
 FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "http://localhost:5173")
 app.add_middleware(
@@ -33,11 +66,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Metrike: latencija/veličina po šablonu rute + SQL naredbe po zahtevu (vidi /metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+for _engine in (engine, async_engine, database.replica_engine, database.async_replica_engine):
+    metrics.instrument_engine(_engine)
+
 # Static za upload
 STATIC_DIR = os.path.join(os.getcwd(), "static")
 UPLOAD_DIR = os.path.join(STATIC_DIR, "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+app.mount("/static", UploadStaticFiles(directory=STATIC_DIR), name="static")
 
 # Javna baza URL-a backend-a (za generisanje apsolutnih linkova na slike)
 BACKEND_PUBLIC_URL = os.getenv("BACKEND_PUBLIC_URL", "http://127.0.0.1:8000").rstrip("/")
@@ -47,9 +85,11 @@ BACKEND_PUBLIC_URL = os.getenv("BACKEND_PUBLIC_URL", "http://127.0.0.1:8000").rs
 # -----------------------------------------------------------------------------
 SECRET_KEY = os.getenv("JWT_SECRET", "change-me-in-prod")
 ALGORITHM = "HS256"
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")  # X-Admin-Token za /admin/*; bez njega su admin rute zatvorene
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7d
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")  # legacy compatibility
+oauth2_optional = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 def _hash_password(raw: str) -> str:
     return hashlib.sha256(raw.encode("utf-8")).hexdigest()
@@ -70,16 +110,150 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    """Javni read-only endpointi: replika ako je DATABASE_REPLICA_URL podešen, inače primarna baza."""
+    async with AsyncReplicaSessionLocal() as db:
+        yield db
+
 # Model refs
 PartnerModel = getattr(models, "Partner", None)
 BagModel = getattr(models, "Bag", None)
 UserModel = getattr(models, "User", None)
+ReservationModel = getattr(models, "Reservation", None)
 HAS_USER = UserModel is not None
 
+# -----------------------------------------------------------------------------
+# Keš javnih listinga + invalidacija posle upisa
+# -----------------------------------------------------------------------------
+BAGS_LIST_TAG = "bags:list"
+bag_list_cache = cache.make_cache(
+    maxsize=int(os.getenv("BAG_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("BAG_CACHE_TTL", "30")),
+    backend=os.getenv("BAG_CACHE_BACKEND", "memory"),
+)
+
+# Pločice sa markerima: precizna invalidacija po kesi/poziciji, TTL ograničava zastarelost između worker-a
+tile_cache = cache.make_cache(
+    maxsize=int(os.getenv("TILE_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("TILE_CACHE_TTL", "60")),
+    backend=os.getenv("BAG_CACHE_BACKEND", "memory"),
+)
+
+# Read-your-writes: partner koji je upravo nešto upisao čita sa primarne baze dok replika ne sustigne.
+# Praćenje je po procesu; klijent između workera to forsira zaglavljem X-Read-Primary: 1.
+# available_now se poredi sa početkom tekućeg prozora od LIVE_BUCKET_S sekundi: isti upit u istom
+# prozoru ima isti ključ keša i ETag (listing se menja i bez upisa, samim protokom vremena)
+LIVE_BUCKET_S = int(os.getenv("LIVE_BUCKET_S", "60"))
+
+def _live_bucket() -> datetime:
+    return datetime.utcfromtimestamp(int(time.time()) // LIVE_BUCKET_S * LIVE_BUCKET_S)
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Kolone su naivne UTC vrednosti; ?pickup_from= / ?date_from=...Z / +02:00 se prevodi pre poređenja."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "10"))
+_partner_last_write: Dict[int, float] = {}
+
+def _bags_changed(bag_ids=(), membership: bool = True, partner_id: Optional[int] = None, points=None):
+    """Poziva se posle commit-a. membership=False: promenjeni su samo podaci u već listanim kesama
+    (npr. kolicina), pa se brišu samo unosi koji ih sadrže; inače se menja skup/redosled rezultata.
+    points: nove (lat, lng) pozicije kesa za keš pločica; None = nepoznate, briše se ceo keš pločica."""
+    if partner_id is not None:
+        _partner_last_write[partner_id] = time.monotonic()
+    if membership:
+        bag_list_cache.invalidate_tags([BAGS_LIST_TAG])
+        tiles.invalidate(tile_cache, bag_ids, points)  # pločice ne prikazuju kolicina
+    else:
+        bag_list_cache.invalidate_tags([f"bag:{bid}" for bid in bag_ids])
+
+def _publish_bag(op: str, bag=None, **fields):
+    """Događaj za /ws/bags i /public/bags/stream; posle commit-a, kao i _bags_changed."""
+    if bag is not None:
+        fields = {**serializers.bag_to_dict(bag, serializers.BAG_PUBLIC_FIELDS), **fields}
+    realtime.hub.publish({"op": op, **fields})
+
+def _publish_bags(db: Session, ops: Dict[int, str], deleted=None):
+    """Batch/bulk upisi: javna polja promenjenih kesa jednim SELECT-om po seriji, pa događaj po kesi.
+    deleted: {id: (lat, lng)} obrisanih kesa (čitano pre brisanja)."""
+    if not realtime.hub.has_subscribers():
+        return
+    for bag_id, (lat, lng) in (deleted or {}).items():
+        _publish_bag("deleted", id=bag_id, lat=lat, lng=lng)
+    ids = [bag_id for bag_id in ops if bag_id not in (deleted or {})]
+    for start in range(0, len(ids), BULK_BATCH_SIZE):
+        chunk = ids[start:start + BULK_BATCH_SIZE]
+        q = select(*serializers.bag_columns(serializers.BAG_PUBLIC_FIELDS)).where(BagModel.id.in_(chunk))
+        for row in db.execute(q):
+            _publish_bag(ops[row.id], row)
+
+def _bags_expired(rows):
+    _bags_changed([r.id for r in rows], points=[(r.lat, r.lng) for r in rows])
+    for r in rows:
+        _publish_bag("expired", id=r.id, status=expiry.EXPIRED, lat=r.lat, lng=r.lng)
+
 # -----------------------------------------------------------------------------
 # Current user dependency (role-aware)
 # -----------------------------------------------------------------------------
-def get_current_identity(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Dict[str, Any]:
+# Tokeni nose nepromenljiv "id" claim; identitet se kešira kratko (TTL) pa partner rute ne idu
+# u bazu na svakom pozivu. Promena is_active poziva revoke_identity(); ostali workeri vide promenu
+# najkasnije posle IDENTITY_CACHE_TTL sekundi.
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "60"))
+identity_cache = cache.make_cache(maxsize=int(os.getenv("IDENTITY_CACHE_SIZE", "10000")), ttl=IDENTITY_CACHE_TTL)
+
+def _identity_model(role: str):
+    if role == "partner":
+        return PartnerModel
+    if role == "customer" and HAS_USER:
+        return UserModel
+    return None
+
+def _load_identity(role: str, subject_id: int) -> Optional[Dict[str, Any]]:
+    key = f"{role}:{subject_id}"
+    cached = identity_cache.get(key)
+    if cached is not cache.MISSING:
+        return cached
+    model = _identity_model(role)
+    if model is None:
+        return None
+    db = SessionLocal()
+    try:
+        row = db.query(model.id, model.email, model.is_active).filter(model.id == subject_id).first()
+    finally:
+        db.close()
+    identity = {"role": role, "id": row.id, "email": row.email} if row and row.is_active else None
+    identity_cache.set(key, identity, tags=[key])
+    return identity
+
+def revoke_identity(role: str, subject_id: int) -> None:
+    identity_cache.invalidate_tags([f"{role}:{subject_id}"])
+
+def _lookup_identity_by_sub(role: str, sub: str) -> Optional[Dict[str, Any]]:
+    # stari tokeni (bez "id" claim-a) — pretraga po sub kao ranije
+    model = _identity_model(role)
+    if model is None:
+        return None
+    db = SessionLocal()
+    try:
+        if role == "partner":
+            row = db.query(model).filter(
+                (model.email == sub) | (model.login_username == sub) | (model.naziv == sub)
+            ).first()
+        else:
+            row = db.query(model).filter(model.email == sub).first()
+    finally:
+        db.close()
+    if not row or not row.is_active:
+        return None
+    return {"role": role, "id": row.id, "email": getattr(row, "email", None)}
+
+def get_current_identity(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Nevažeći token",
@@ -89,27 +263,31 @@ def get_current_identity(token: str = Depends(oauth2_scheme), db: Session = Depe
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         sub: str = payload.get("sub")
         role: str = payload.get("role", "partner")
+        subject_id = payload.get("id")
         if sub is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    identity = {"role": role, "id": None, "email": None}
-    if role == "partner" and PartnerModel is not None:
-        partner = db.query(PartnerModel).filter(
-            (PartnerModel.email == sub) | (PartnerModel.login_username == sub) | (PartnerModel.naziv == sub)
-        ).first()
-        if not partner:
-            raise credentials_exception
-        identity.update({"id": partner.id, "email": getattr(partner, "email", None)})
-    elif role == "customer" and HAS_USER:
-        user = db.query(UserModel).filter(UserModel.email == sub).first()
-        if not user:
+    if subject_id is not None:
+        try:
+            identity = _load_identity(role, int(subject_id))
+        except (TypeError, ValueError):
             raise credentials_exception
-        identity.update({"id": user.id, "email": user.email})
     else:
+        identity = _lookup_identity_by_sub(role, sub)
+    if identity is None:
         raise credentials_exception
-    return identity
+    return dict(identity)
+
+def get_optional_identity(token: Optional[str] = Depends(oauth2_optional)) -> Optional[Dict[str, Any]]:
+    # javni endpointi: bez tokena (ili sa isteklim) korisnik je anoniman
+    if not token:
+        return None
+    try:
+        return get_current_identity(token)
+    except HTTPException:
+        return None
 
 # -----------------------------------------------------------------------------
 # Legacy partner login (/token) — kompatibilnost sa frontendom
@@ -136,7 +314,7 @@ def legacy_login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
         if not _verify_password(password, stored):
             raise HTTPException(status_code=400, detail="Pogrešan username/email ili lozinka.")
 
-    token = create_access_token({"sub": partner.login_username or partner.email or partner.naziv, "role": "partner"})
+    token = create_access_token({"sub": partner.login_username or partner.email or partner.naziv, "role": "partner", "id": partner.id})
     return {"access_token": token, "token_type": "bearer", "role": "partner"}
 
 # -----------------------------------------------------------------------------
@@ -165,7 +343,7 @@ def auth_login(body: LoginBody, db: Session = Depends(get_db)):
                 stored = getattr(partner, "password_hash", None)
                 ok = (_verify_password(body.password, stored) if stored else getattr(partner, "password", None) == body.password)
                 if ok:
-                    token = create_access_token({"sub": partner.login_username or partner.email or partner.naziv, "role": "partner"})
+                    token = create_access_token({"sub": partner.login_username or partner.email or partner.naziv, "role": "partner", "id": partner.id})
                     return {"access_token": token, "token_type": "bearer", "role": "partner"}
         if body.role == "partner":
             raise HTTPException(status_code=400, detail="Pogrešan email/username ili lozinka.")
@@ -177,7 +355,7 @@ def auth_login(body: LoginBody, db: Session = Depends(get_db)):
             raise HTTPException(status_code=400, detail="Pogrešan email ili lozinka.")
         if not _verify_password(body.password, user.password_hash):
             raise HTTPException(status_code=400, detail="Pogrešan email ili lozinka.")
-        token = create_access_token({"sub": user.email, "role": "customer"})
+        token = create_access_token({"sub": user.email, "role": "customer", "id": user.id})
         return {"access_token": token, "token_type": "bearer", "role": "customer"}
     raise HTTPException(status_code=400, detail="Neispravni kredencijali.")
 
@@ -198,7 +376,7 @@ def auth_register(body: RegisterBody, db: Session = Depends(get_db)):
     db.add(user)
     db.commit()
     db.refresh(user)
-    token = create_access_token({"sub": user.email, "role": "customer"})
+    token = create_access_token({"sub": user.email, "role": "customer", "id": user.id})
     return {"access_token": token, "token_type": "bearer", "role": "customer"}
 
 # -----------------------------------------------------------------------------
@@ -209,25 +387,51 @@ def require_partner(identity=Depends(get_current_identity)):
         raise HTTPException(status_code=403, detail="Dozvoljen pristup samo partnerima.")
     return identity
 
+def _partner_reads_primary(partner_id: int, force: bool = False) -> bool:
+    if not database.HAS_REPLICA or force:
+        return True
+    last = _partner_last_write.get(partner_id)
+    return last is not None and time.monotonic() - last < READ_YOUR_WRITES_WINDOW
+
+def get_partner_read_db(
+    identity=Depends(require_partner),
+    x_read_primary: Optional[str] = Header(None),
+):
+    """Partner GET rute: replika, osim odmah posle sopstvenog upisa ili uz X-Read-Primary: 1."""
+    factory = SessionLocal if _partner_reads_primary(identity["id"], x_read_primary == "1") else ReplicaSessionLocal
+    db = factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _reject_relevance_cursor(sort_by: str, cursor: Optional[str]):
+    if sort_by == "relevance" and cursor is not None:
+        raise HTTPException(status_code=400, detail="sort_by=relevance ne podržava cursor paginaciju.")
+
+def _count_transition(db: Session, partner_id: int, old_status: Optional[str], new_status: Optional[str], n: int = 1):
+    counters.apply_deltas(db, counters.transition(Counter(), partner_id, old_status, new_status, n))
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN or not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Dozvoljen pristup samo administratorima.")
+    return True
+
 # -----------------------------------------------------------------------------
 # Partners (za baner na frontendu)
 # -----------------------------------------------------------------------------
 @app.get("/partners")
-def list_partners(db: Session = Depends(get_db)):
+async def list_partners(request: Request, db: AsyncSession = Depends(get_async_read_db)):
     if PartnerModel is None:
         return []
-    rows = db.query(PartnerModel).order_by(asc(PartnerModel.id)).all()
-    return [
-        {
-            "id": p.id,
-            "naziv": p.naziv,
-            "adresa": p.adresa,
-            "lat": p.lat,
-            "lng": p.lng,
-            "thumbnail_url": p.thumbnail_url,
-        }
-        for p in rows
-    ]
+    version, changed_at = await versions.current(db, versions.PARTNERS)
+    etag = conditional.weak_etag("partners", version)
+    if conditional.is_fresh(request.headers, etag, changed_at):
+        return conditional.not_modified(etag, changed_at)
+    fields = serializers.PARTNER_PUBLIC_FIELDS
+    rows = await db.execute(select(*serializers.columns(PartnerModel, fields)).order_by(asc(PartnerModel.id)))
+    return FastJSONResponse([serializers.to_dict(p, fields) for p in rows],
+                            headers=conditional.headers(etag, changed_at))
 
 # -----------------------------------------------------------------------------
 # PARTNER — Bags (uskladjeno sa src/api.js)
@@ -235,84 +439,302 @@ def list_partners(db: Session = Depends(get_db)):
 @app.get("/partner/bags/page")
 def partner_bags_page(
     identity=Depends(require_partner),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_partner_read_db),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=200),
     sort_by: str = Query("id"),
     sort_dir: str = Query("desc"),
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    with_total: Optional[bool] = None,
 ):
     if BagModel is None:
         return {"items": [], "total": 0, "page": page, "size": page_size, "pages": 0}
-    q = db.query(BagModel).filter(BagModel.partner_id == identity["id"])
-    if search:
-        s = f"%{search}%"
-        q = q.filter(or_(BagModel.naziv.ilike(s), BagModel.opis.ilike(s)))
-    sort_col = getattr(BagModel, sort_by, getattr(BagModel, "id"))
-    q = q.order_by(desc(sort_col) if sort_dir == "desc" else asc(sort_col))
-    total = q.count()
-    rows = q.offset((page - 1) * page_size).limit(page_size).all()
-    items = [
-        {
-            "id": r.id,
-            "naziv": r.naziv,
-            "opis": r.opis,
-            "cena": float(r.cena),
-            "kolicina": r.kolicina,
-            "vreme_preuzimanja": r.vreme_preuzimanja,
-            "status": r.status,
-            "partner_id": r.partner_id,
-            "adresa": r.adresa,
-            "lat": r.lat,
-            "lng": r.lng,
-            "thumbnail_url": r.thumbnail_url,
-            "created_at": r.created_at,
-        }
-        for r in rows
-    ]
-    pages = (total + page_size - 1) // page_size
-    return {"items": items, "total": total, "page": page, "size": page_size, "pages": pages}
+    # cursor mod (cursor="" = prva strana) ne broji ukupno osim ako se eksplicitno traži
+    if with_total is None:
+        with_total = cursor is None
+    _reject_relevance_cursor(sort_by, cursor)
+    # cursor ne ide uz relevance, pa je sort kolona za cursor uvek obična kolona
+    cols = serializers.bag_columns(serializers.BAG_FIELDS, extra=[bag_queries.sort_column(sort_by)] if cursor is not None else [])
+    q, sort_col = bag_queries.partner(db.query(*cols), identity["id"], search, sort_by, DB_DIALECT)
+    total = q.count() if with_total else None
+    after = pagination.decode_cursor(cursor, sort_by, sort_dir) if cursor is not None else None
+    rows = bag_queries.page(q, sort_col, sort_dir, page, page_size, cursor, after).all()
+    next_cursor = None
+    if cursor is not None and len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = pagination.encode_cursor(sort_by, sort_dir, getattr(rows[-1], sort_col.key), rows[-1].id)
+    items = [serializers.bag_to_dict(r) for r in rows]
+    if cursor is not None:
+        return FastJSONResponse({"items": items, "total": total, "size": page_size, "next_cursor": next_cursor})
+    pages = (total + page_size - 1) // page_size if total is not None else None
+    return FastJSONResponse({"items": items, "total": total, "page": page, "size": page_size, "pages": pages})
 
 @app.get("/partner/bags/counts")
-def partner_bag_counts(identity=Depends(require_partner), db: Session = Depends(get_db)):
-    if BagModel is None:
-        return {"total": 0, "active": 0, "sold_out": 0}
-    q = db.query(BagModel).filter(BagModel.partner_id == identity["id"])
-    total = q.count()
-    active = q.filter(BagModel.status == "active").count()
-    sold = q.filter(BagModel.status == "sold_out").count()
-    return {"total": total, "active": active, "sold_out": sold}
-
-@app.get("/partner/bags/export")
-def partner_bags_export(
+def partner_bag_counts(
     identity=Depends(require_partner),
     db: Session = Depends(get_db),
-    search: Optional[str] = None,
-    sort_by: str = Query("id"),
-    sort_dir: str = Query("desc"),
+    # exact=true: jedan GROUP BY nad bags + ponovno poravnanje brojača
+    exact: bool = False,
 ):
     if BagModel is None:
-        raise HTTPException(status_code=500, detail="Bag model nije dostupan.")
-    q = db.query(BagModel).filter(BagModel.partner_id == identity["id"])
-    if search:
-        s = f"%{search}%"
-        q = q.filter(or_(BagModel.naziv.ilike(s), BagModel.opis.ilike(s)))
-    sort_col = getattr(BagModel, sort_by, getattr(BagModel, "id"))
-    q = q.order_by(desc(sort_col) if sort_dir == "desc" else asc(sort_col))
-    rows = q.all()
+        return {"total": 0, "active": 0, "sold_out": 0, "by_status": {}}
+    # uvek primarna baza: brojači se ovde mogu i ponovo izgraditi (upis)
+    by_status = {} if exact else counters.read(db, identity["id"])
+    if not by_status:
+        by_status = counters.recount(db, identity["id"])
+        db.commit()
+    by_status = {k: v for k, v in by_status.items() if v}
+    return {
+        "total": sum(by_status.values()),
+        "active": by_status.get("active", 0),
+        "sold_out": by_status.get("sold_out", 0),
+        "by_status": by_status,
+    }
+
+EXPORT_COLUMNS = ["id","naziv","opis","cena","kolicina","vreme_preuzimanja","status","category","adresa","lat","lng","thumbnail_url","created_at"]
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_FLUSH_BYTES = 64 * 1024
+
+def _export_rows(partner_id: int, search: Optional[str], sort_by: str, sort_dir: str,
+                 date_from: Optional[datetime], date_to: Optional[datetime], session_factory=SessionLocal):
+    # sopstvena sesija: generator radi posle izlaska iz handlera (i zatvaranja get_db sesije)
+    db = session_factory()
+    try:
+        q, sort_col = bag_queries.partner(db.query(*[getattr(BagModel, c) for c in EXPORT_COLUMNS]),
+                                          partner_id, search, sort_by, DB_DIALECT)
+        if date_from is not None:
+            q = q.filter(BagModel.created_at >= date_from)
+        if date_to is not None:
+            q = q.filter(BagModel.created_at < date_to)
+        q = bag_queries.ordered(q, sort_col, sort_dir)
+        # yield_per: server-side cursor na Postgresu, redovi stižu u serijama
+        for row in q.yield_per(EXPORT_BATCH_SIZE):
+            yield row
+    finally:
+        db.close()
 
+def _export_csv(rows):
     buf = io.StringIO()
     writer = csv.writer(buf)
-    writer.writerow(["id","naziv","opis","cena","kolicina","vreme_preuzimanja","status","adresa","lat","lng","thumbnail_url","created_at"])
+    writer.writerow(EXPORT_COLUMNS)
     for r in rows:
         writer.writerow([
             r.id, r.naziv, r.opis, float(r.cena), r.kolicina,
             r.vreme_preuzimanja.isoformat() if r.vreme_preuzimanja else "",
-            r.status, r.adresa, r.lat, r.lng, r.thumbnail_url,
+            r.status, r.category, r.adresa, r.lat, r.lng, r.thumbnail_url,
             r.created_at.isoformat() if r.created_at else ""
         ])
-    buf.seek(0)
-    return StreamingResponse(iter([buf.getvalue()]), media_type="text/csv; charset=utf-8")
+        if buf.tell() >= EXPORT_FLUSH_BYTES:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+def _export_ndjson(rows):
+    chunk = []
+    size = 0
+    for r in rows:
+        line = json.dumps({
+            "id": r.id, "naziv": r.naziv, "opis": r.opis, "cena": float(r.cena), "kolicina": r.kolicina,
+            "vreme_preuzimanja": r.vreme_preuzimanja.isoformat() if r.vreme_preuzimanja else None,
+            "status": r.status, "category": r.category, "adresa": r.adresa, "lat": r.lat, "lng": r.lng,
+            "thumbnail_url": r.thumbnail_url,
+            "created_at": r.created_at.isoformat() if r.created_at else None,
+        }, ensure_ascii=False) + "\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= EXPORT_FLUSH_BYTES:
+            yield "".join(chunk).encode("utf-8")
+            chunk, size = [], 0
+    yield "".join(chunk).encode("utf-8")
+
+def _gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip format
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+@app.get("/partner/bags/export")
+def partner_bags_export(
+    identity=Depends(require_partner),
+    search: Optional[str] = None,
+    sort_by: str = Query("id"),
+    sort_dir: str = Query("desc"),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson|jsonl)$"),
+    compress: bool = Query(False, alias="gzip"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    x_read_primary: Optional[str] = Header(None),
+):
+    if BagModel is None:
+        raise HTTPException(status_code=500, detail="Bag model nije dostupan.")
+    primary = _partner_reads_primary(identity["id"], x_read_primary == "1")
+    rows = _export_rows(identity["id"], search, sort_by, sort_dir, _naive_utc(date_from), _naive_utc(date_to),
+                        session_factory=SessionLocal if primary else ReplicaSessionLocal)
+    if export_format == "csv":
+        body, media_type, filename = _export_csv(rows), "text/csv; charset=utf-8", "kese.csv"
+    else:
+        body, media_type, filename = _export_ndjson(rows), "application/x-ndjson", f"kese.{export_format}"
+    if compress:
+        body, media_type, filename = _gzip_stream(body), "application/gzip", filename + ".gz"
+    return StreamingResponse(
+        body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# -----------------------------------------------------------------------------
+# PARTNER — Bulk import (CSV iz exporta ili JSON niz)
+# -----------------------------------------------------------------------------
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "5000"))
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+BULK_FIELDS = ["naziv","opis","cena","kolicina","vreme_preuzimanja","status","category","adresa","lat","lng","thumbnail_url"]
+
+def _bulk_parse(raw: bytes, content_type: str) -> List[Dict[str, Any]]:
+    try:
+        if "csv" in content_type:
+            reader = csv.DictReader(io.StringIO(raw.decode("utf-8-sig")))
+            # prazna ćelija u CSV-u = nema vrednosti
+            return [{k: (v if v != "" else None) for k, v in row.items() if k} for row in reader]
+        if "ndjson" in content_type or "jsonl" in content_type:
+            return [json.loads(line) for line in raw.decode("utf-8").splitlines() if line.strip()]
+        data = json.loads(raw or b"null")
+    except (UnicodeDecodeError, ValueError, csv.Error):
+        raise HTTPException(status_code=400, detail="Neispravan sadržaj (očekuje se CSV ili JSON niz).")
+    if not isinstance(data, list) or not all(isinstance(r, dict) for r in data):
+        raise HTTPException(status_code=400, detail="Očekuje se JSON niz objekata.")
+    return data
+
+def _bulk_upsert(partner_id: int, raw_rows: List[Dict[str, Any]], atomic: bool) -> Dict[str, Any]:
+    table = BagModel.__table__
+    results: List[Dict[str, Any]] = [None] * len(raw_rows)
+    inserts, updates = [], []  # (indeks reda, vrednosti)
+    for i, raw in enumerate(raw_rows):
+        bag_id = raw.get("id")
+        given = {f: raw[f] for f in BULK_FIELDS if raw.get(f) is not None}
+        try:
+            bag_id = int(bag_id) if bag_id is not None else None
+            if bag_id is None:
+                body = schemas.BagCreate(**given, partner_id=partner_id)
+            else:
+                body = schemas.BagUpdate(**given)
+        except (ValueError, TypeError) as e:
+            errors = e.errors() if hasattr(e, "errors") else [{"loc": ("id",), "msg": str(e)}]
+            results[i] = {"row": i, "ok": False,
+                          "errors": [{"field": ".".join(str(x) for x in err["loc"]), "msg": err["msg"]} for err in errors]}
+            continue
+        if bag_id is not None:
+            # izmena: samo polja prisutna u redu, kao update_bag (status ostaje ako nije poslat)
+            values = {f: v for f, v in body.dict(include=set(given)).items() if v is not None}
+            updates.append((i, bag_id, values))
+            continue
+        values = {f: getattr(body, f) for f in BULK_FIELDS}
+        values["status"] = values["status"] or "active"
+        # Core upis zaobilazi ORM listener, pa se izvedene kolone računaju ovde
+        values["geo_cell"] = geo.cell_for(values["lat"], values["lng"])
+        values["search_norm"] = textsearch.document(values["naziv"], values["opis"])
+        inserts.append((i, bag_id, values))
+
+    db = SessionLocal()
+    try:
+        # postojeći redovi: stari status za brojače i izvori izvedenih kolona za delimične izmene
+        existing: Dict[int, Any] = {}
+        update_ids = [bag_id for _, bag_id, _ in updates]
+        for start in range(0, len(update_ids), BULK_BATCH_SIZE):
+            chunk = update_ids[start:start + BULK_BATCH_SIZE]
+            existing.update((r.id, r) for r in db.execute(
+                select(BagModel.id, BagModel.status, BagModel.naziv, BagModel.opis, BagModel.lat, BagModel.lng)
+                .where(BagModel.partner_id == partner_id, BagModel.id.in_(chunk))
+                .with_for_update()
+            ))
+        found = []
+        for i, bag_id, values in updates:
+            if bag_id not in existing:
+                results[i] = {"row": i, "ok": False, "errors": [{"field": "id", "msg": "Kesa nije pronađena."}]}
+                continue
+            merged = {**existing[bag_id]._asdict(), **values}
+            if "lat" in values or "lng" in values:
+                values["geo_cell"] = geo.cell_for(merged["lat"], merged["lng"])
+            if "naziv" in values or "opis" in values:
+                values["search_norm"] = textsearch.document(merged["naziv"], merged["opis"])
+            found.append((i, bag_id, values, (merged["lat"], merged["lng"])))
+        failed = sum(1 for r in results if r is not None)
+        if atomic and failed:
+            return {"inserted": 0, "updated": 0, "failed": failed, "results": [r for r in results if r is not None]}
+
+        deltas = Counter()
+        now = datetime.utcnow()
+        for start in range(0, len(inserts), BULK_BATCH_SIZE):
+            batch = inserts[start:start + BULK_BATCH_SIZE]
+            # executemany + RETURNING (insertmanyvalues): jedan višeredni INSERT po seriji
+            ids = db.scalars(
+                insert(table).returning(table.c.id, sort_by_parameter_order=True),
+                [{**values, "partner_id": partner_id, "created_at": now} for _, _, values in batch],
+            ).all()
+            for (i, _, values), bag_id in zip(batch, ids):
+                counters.transition(deltas, partner_id, None, values["status"])
+                results[i] = {"row": i, "ok": True, "id": bag_id, "action": "insert"}
+        # executemany traži iste kolone u svakom redu: jedna naredba po skupu poslatih polja
+        statuses = {bag_id: row.status for bag_id, row in existing.items()}
+        by_columns: Dict[tuple, list] = {}
+        for item in found:
+            by_columns.setdefault(tuple(sorted(item[2])), []).append(item)
+        for columns, group in by_columns.items():
+            stmt = (
+                update(table)
+                .where(table.c.id == bindparam("b_id"), table.c.partner_id == partner_id)
+                .values({f: bindparam(f) for f in columns})
+            )
+            for start in range(0, len(group), BULK_BATCH_SIZE):
+                batch = group[start:start + BULK_BATCH_SIZE]
+                if columns:
+                    db.execute(stmt, [{**values, "b_id": bag_id} for _, bag_id, values, _ in batch])
+                for i, bag_id, values, _ in batch:
+                    if "status" in values:
+                        counters.transition(deltas, partner_id, statuses[bag_id], values["status"])
+                        statuses[bag_id] = values["status"]  # isti id može doći u više redova
+                    results[i] = {"row": i, "ok": True, "id": bag_id, "action": "update"}
+        counters.apply_deltas(db, deltas)
+        changed_ids = [r["id"] for r in results if r["ok"]]
+        if changed_ids:
+            versions.mark(db, versions.BAGS)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    if changed_ids:
+        _bags_changed(changed_ids, partner_id=partner_id,
+                      points=[(values["lat"], values["lng"]) for _, _, values in inserts] + [p for *_, p in found])
+        with SessionLocal() as db:
+            _publish_bags(db, {r["id"]: "created" if r["action"] == "insert" else "updated"
+                               for r in results if r["ok"]})
+    return {
+        "inserted": sum(1 for r in results if r.get("action") == "insert"),
+        "updated": sum(1 for r in results if r.get("action") == "update"),
+        "failed": sum(1 for r in results if not r["ok"]),
+        "results": results,
+    }
+
+@app.post("/partner/bags/bulk")
+async def partner_bags_bulk(
+    request: Request,
+    identity=Depends(require_partner),
+    # atomic=true: ako bilo koji red nije ispravan, ništa se ne upisuje
+    atomic: bool = False,
+):
+    """Telo: CSV sa kolonama iz /partner/bags/export (text/csv), JSON niz ili NDJSON.
+    Red sa "id" ažurira postojeću kesu partnera, red bez "id" dodaje novu."""
+    if BagModel is None:
+        raise HTTPException(status_code=500, detail="Bag model nije dostupan.")
+    rows = _bulk_parse(await request.body(), request.headers.get("content-type", ""))
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Najviše {BULK_MAX_ROWS} redova po zahtevu.")
+    report = await run_in_threadpool(_bulk_upsert, identity["id"], rows, atomic)
+    status_code = 422 if atomic and report["failed"] else 200
+    return FastJSONResponse(report, status_code=status_code)
 
 @app.post("/partner/bags")
 def create_bag(
@@ -329,6 +751,7 @@ def create_bag(
         kolicina=body.kolicina,
         vreme_preuzimanja=body.vreme_preuzimanja,
         status=body.status or "active",
+        category=body.category,
         partner_id=identity["id"],
         adresa=body.adresa,
         lat=body.lat,
@@ -337,12 +760,21 @@ def create_bag(
         created_at=datetime.utcnow(),
     )
     db.add(bag)
+    _count_transition(db, identity["id"], None, bag.status)
     db.commit()
     db.refresh(bag)
-    return {"id": bag.id, "naziv": bag.naziv, "opis": bag.opis, "cena": float(bag.cena),
-            "kolicina": bag.kolicina, "vreme_preuzimanja": bag.vreme_preuzimanja,
-            "status": bag.status, "partner_id": bag.partner_id, "adresa": bag.adresa,
-            "lat": bag.lat, "lng": bag.lng, "thumbnail_url": bag.thumbnail_url, "created_at": bag.created_at}
+    _bags_changed([bag.id], partner_id=identity["id"], points=[(bag.lat, bag.lng)])
+    _publish_bag("created", bag)
+    return FastJSONResponse(serializers.bag_to_dict(bag))
+
+def _locked_partner_bag(db: Session, partner_id: int, bag_id: int):
+    # FOR UPDATE kao u partner_bags_batch: /reserve ne sme da promeni status između čitanja
+    # i commit-a, jer se prelaz za brojače računa iz pročitanog (starog) statusa
+    bag = (db.query(BagModel).filter(BagModel.id == bag_id, BagModel.partner_id == partner_id)
+           .with_for_update().first())
+    if not bag:
+        raise HTTPException(status_code=404, detail="Kesa nije pronađena.")
+    return bag
 
 @app.put("/partner/bags/{bag_id}")
 def update_bag(
@@ -353,48 +785,190 @@ def update_bag(
 ):
     if BagModel is None:
         raise HTTPException(status_code=500, detail="Bag model nije dostupan.")
-    bag = db.query(BagModel).filter(BagModel.id == bag_id, BagModel.partner_id == identity["id"]).first()
-    if not bag:
-        raise HTTPException(status_code=404, detail="Kesa nije pronađena.")
-    for field in ["naziv","opis","cena","kolicina","vreme_preuzimanja","status","adresa","lat","lng","thumbnail_url"]:
+    bag = _locked_partner_bag(db, identity["id"], bag_id)
+    old_status = bag.status
+    for field in ["naziv","opis","cena","kolicina","vreme_preuzimanja","status","category","adresa","lat","lng","thumbnail_url"]:
         val = getattr(body, field, None)
         if val is not None:
             setattr(bag, field, val)
+    _count_transition(db, bag.partner_id, old_status, bag.status)
     db.commit()
     db.refresh(bag)
-    return {"id": bag.id, "naziv": bag.naziv, "opis": bag.opis, "cena": float(bag.cena),
-            "kolicina": bag.kolicina, "vreme_preuzimanja": bag.vreme_preuzimanja,
-            "status": bag.status, "partner_id": bag.partner_id, "adresa": bag.adresa,
-            "lat": bag.lat, "lng": bag.lng, "thumbnail_url": bag.thumbnail_url, "created_at": bag.created_at}
+    _bags_changed([bag.id], partner_id=identity["id"], points=[(bag.lat, bag.lng)])
+    _publish_bag("updated", bag)
+    return FastJSONResponse(serializers.bag_to_dict(bag))
 
 @app.delete("/partner/bags/{bag_id}")
 def delete_bag(bag_id: int, identity=Depends(require_partner), db: Session = Depends(get_db)):
     if BagModel is None:
         raise HTTPException(status_code=500, detail="Bag model nije dostupan.")
-    bag = db.query(BagModel).filter(BagModel.id == bag_id, BagModel.partner_id == identity["id"]).first()
-    if not bag:
-        raise HTTPException(status_code=404, detail="Kesa nije pronađena.")
+    bag = _locked_partner_bag(db, identity["id"], bag_id)
+    _count_transition(db, bag.partner_id, bag.status, None)
+    lat, lng = bag.lat, bag.lng
     db.delete(bag)
     db.commit()
+    _bags_changed([bag_id], partner_id=identity["id"], points=[(lat, lng)])
+    _publish_bag("deleted", id=bag_id, lat=lat, lng=lng)
     return {"ok": True}
 
 @app.patch("/partner/bags/{bag_id}/status")
 def set_bag_status(bag_id: int, status_value: str, identity=Depends(require_partner), db: Session = Depends(get_db)):
     if BagModel is None:
         raise HTTPException(status_code=500, detail="Bag model nije dostupan.")
-    bag = db.query(BagModel).filter(BagModel.id == bag_id, BagModel.partner_id == identity["id"]).first()
-    if not bag:
-        raise HTTPException(status_code=404, detail="Kesa nije pronađena.")
+    bag = _locked_partner_bag(db, identity["id"], bag_id)
+    _count_transition(db, bag.partner_id, bag.status, status_value)
     bag.status = status_value
+    event = {"id": bag_id, "status": status_value, "kolicina": bag.kolicina, "lat": bag.lat, "lng": bag.lng}
     db.commit()
+    _bags_changed([bag_id], partner_id=identity["id"], points=[(event["lat"], event["lng"])])
+    _publish_bag("status", **event)
     return {"ok": True}
 
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "5000"))
+
+def _batch_target(partner_id: int, op: schemas.BagBatchOp):
+    cond = [BagModel.partner_id == partner_id]
+    if not op.all:
+        cond.append(BagModel.id.in_(op.ids))
+    if op.where_status is not None:
+        cond.append(BagModel.status == op.where_status)
+    return cond
+
+def _batch_fields(op: schemas.BagBatchOp) -> Dict[str, Any]:
+    # kao update_bag: None znači "bez izmene" (naziv/cena su NOT NULL, opis se ne briše slučajno)
+    if op.fields is None:
+        return {}
+    values = {f: v for f, v in op.fields.dict(exclude_unset=True).items() if v is not None}
+    values.pop("partner_id", None)
+    return values
+
+@app.post("/partner/bags/batch")
+def partner_bags_batch(body: schemas.BagBatch, identity=Depends(require_partner), db: Session = Depends(get_db)):
+    """Operacije se primenjuju redom, u jednoj transakciji; svaka je jedan UPDATE/DELETE nad svim ciljanim kesama."""
+    if BagModel is None:
+        raise HTTPException(status_code=500, detail="Bag model nije dostupan.")
+    partner_id = identity["id"]
+    for n, op in enumerate(body.operations):
+        if not op.all and not op.ids:
+            raise HTTPException(status_code=400, detail=f"Operacija {n}: potrebno je ids ili all=true.")
+        if op.ids and len(op.ids) > BATCH_MAX_IDS:
+            raise HTTPException(status_code=413, detail=f"Operacija {n}: najviše {BATCH_MAX_IDS} kesa.")
+        if op.op == "status" and not op.status:
+            raise HTTPException(status_code=400, detail=f"Operacija {n}: nedostaje status.")
+        if op.op == "update" and not _batch_fields(op):
+            raise HTTPException(status_code=400, detail=f"Operacija {n}: nedostaju polja za izmenu.")
+
+    deltas = Counter()
+    changed_ids = set()
+    events: Dict[int, str] = {}  # poslednja operacija po kesi -> realtime događaj
+    deleted: Dict[int, Any] = {}
+    results = []
+    for op in body.operations:
+        cond = _batch_target(partner_id, op)
+        # stari statusi za brojače; FOR UPDATE da /reserve ne promeni status između SELECT-a i UPDATE-a
+        rows = db.execute(select(BagModel.id, BagModel.status, BagModel.lat, BagModel.lng)
+                          .where(*cond).with_for_update()).all()
+        current = {r.id: r.status for r in rows}
+        missing = sorted(set(op.ids or ()) - set(current))
+        if current:
+            target = [BagModel.partner_id == partner_id, BagModel.id.in_(list(current))]
+            if op.op == "delete":
+                db.execute(delete(BagModel).where(*target).execution_options(synchronize_session=False))
+                for old in current.values():
+                    counters.transition(deltas, partner_id, old, None)
+                deleted.update((r.id, (r.lat, r.lng)) for r in rows)
+            else:
+                if op.op == "status":
+                    values = {"status": op.status}
+                else:
+                    values = _batch_fields(op)
+                    if "lat" in values and "lng" in values:
+                        values["geo_cell"] = geo.cell_for(values["lat"], values["lng"])
+                    if "naziv" in values and "opis" in values:
+                        values["search_norm"] = textsearch.document(values["naziv"], values["opis"])
+                db.execute(update(BagModel).where(*target).values(values).execution_options(synchronize_session=False))
+                if "status" in values:
+                    for old in current.values():
+                        counters.transition(deltas, partner_id, old, values["status"])
+                stale_geo = ("lat" in values or "lng" in values) and "geo_cell" not in values
+                stale_text = ("naziv" in values or "opis" in values) and "search_norm" not in values
+                if stale_geo or stale_text:
+                    # delimična izmena izvora: izvedene kolone po redu, jedan executemany
+                    rows = db.execute(select(BagModel.id, BagModel.naziv, BagModel.opis, BagModel.lat, BagModel.lng)
+                                      .where(*target)).all()
+                    db.execute(
+                        update(BagModel.__table__)
+                        .where(BagModel.__table__.c.id == bindparam("b_id"))
+                        .values(geo_cell=bindparam("geo_cell"), search_norm=bindparam("search_norm")),
+                        [{"b_id": r.id, "geo_cell": geo.cell_for(r.lat, r.lng),
+                          "search_norm": textsearch.document(r.naziv, r.opis)} for r in rows],
+                    )
+            changed_ids.update(current)
+            events.update(dict.fromkeys(current, "status" if op.op == "status" else "updated"))
+        results.append({"op": op.op, "matched": len(current), "missing": missing})
+    counters.apply_deltas(db, deltas)
+    if changed_ids:
+        versions.mark(db, versions.BAGS)
+    db.commit()
+    if changed_ids:
+        _bags_changed(sorted(changed_ids), partner_id=partner_id)
+        _publish_bags(db, events, deleted)
+    return FastJSONResponse({"results": results, "changed": len(changed_ids)})
+
 # -----------------------------------------------------------------------------
 # PUBLIC — Bags
 # -----------------------------------------------------------------------------
+PRICE_FACET_STEP = float(os.getenv("PRICE_FACET_STEP", "2"))  # širina razreda histograma cena
+MAX_RADIUS_KM = float(os.getenv("MAX_RADIUS_KM", "50"))  # veći krug = skoro ceo grad po upitu, bez keša
+
+def _parse_categories(value: Optional[str]) -> List[str]:
+    """?category=pekara,kafic -> ["kafic", "pekara"] (normalizovano, bez duplikata)."""
+    if not value:
+        return []
+    return sorted({c for c in (schemas.normalize_category(part) for part in value.split(",")) if c})
+
+def _price_bucket(col):
+    # cena >= 0: CAST (odsecanje) je floor i na SQLite-u; Postgres CAST zaokružuje (vidi geo.grid_index)
+    scaled = col / PRICE_FACET_STEP
+    return cast(scaled, Integer) if DB_DIALECT == "sqlite" else cast(func.floor(scaled), Integer)
+
+class _Facets:
+    """Brojevi po (kategorija, cenovni razred). Kategorije se broje bez sopstvenog filtera (broj na
+    svakom čipu), histogram cena i total poštuju i izabrane kategorije."""
+
+    def __init__(self, categories: List[str]):
+        self.categories = set(categories)
+        self.by_category: Counter = Counter()
+        self.by_price: Counter = Counter()
+
+    def add(self, category: Optional[str], bucket: int, n: int = 1):
+        self.by_category[category] += n
+        if not self.categories or category in self.categories:
+            self.by_price[bucket] += n
+
+    @property
+    def total(self) -> int:
+        return sum(self.by_price.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "category": [{"value": c, "count": n}
+                         for c, n in sorted(self.by_category.items(), key=lambda kv: (-kv[1], kv[0] or ""))],
+            "price": [{"min": b * PRICE_FACET_STEP, "max": (b + 1) * PRICE_FACET_STEP, "count": n}
+                      for b, n in sorted(self.by_price.items())],
+        }
+
+async def _aggregate_facets(db: AsyncSession, base, facets: _Facets) -> None:
+    # jedan GROUP BY (kategorija, razred); razred se računa u podupitu pa se grupiše po koloni
+    inner = base.with_only_columns(BagModel.category, _price_bucket(BagModel.cena).label("bucket")).subquery()
+    q = select(inner.c.category, inner.c.bucket, func.count()).group_by(inner.c.category, inner.c.bucket)
+    for category, bucket, n in await db.execute(q):
+        facets.add(category, bucket, n)
+
 @app.get("/public/bags/page")
-def public_bags_page(
-    db: Session = Depends(get_db),
+async def public_bags_page(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=200),
     search: Optional[str] = None,
@@ -403,107 +977,469 @@ def public_bags_page(
     category: Optional[str] = None,
     sort_by: str = Query("id"),
     sort_dir: str = Query("desc"),
-    within_km: Optional[float] = Query(None, alias="radius_km"),
-    lat: Optional[float] = None,
-    lng: Optional[float] = None,
+    within_km: Optional[float] = Query(None, alias="radius_km", gt=0, le=MAX_RADIUS_KM),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    cursor: Optional[str] = None,
+    with_total: Optional[bool] = None,
+    available_now: bool = False,
+    pickup_from: Optional[datetime] = None,
+    pickup_to: Optional[datetime] = None,
+    facets: bool = False,
 ):
     if BagModel is None:
         return {"items": [], "total": 0, "page": page, "page_size": page_size}
-    q = db.query(BagModel).filter(BagModel.status == "active")
-    if search:
-        s = f"%{search}%"
-        q = q.filter(or_(BagModel.naziv.ilike(s), BagModel.opis.ilike(s)))
-    if min_price is not None:
-        q = q.filter(BagModel.cena >= min_price)
-    if max_price is not None:
-        q = q.filter(BagModel.cena <= max_price)
-    if within_km and lat is not None and lng is not None:
-        import math
-        km_per_deg_lat = 111.0
-        km_per_deg_lng = 111.0 * max(0.1, abs(math.cos(math.radians(lat))))
-        dlat = within_km / km_per_deg_lat
-        dlng = within_km / km_per_deg_lng
-        q = q.filter(
-            BagModel.lat.between(lat - dlat, lat + dlat),
-            BagModel.lng.between(lng - dlng, lng + dlng),
-        )
-    total = q.count()
-    sort_col = getattr(BagModel, sort_by, getattr(BagModel, "id"))
-    q = q.order_by(desc(sort_col) if sort_dir == "desc" else asc(sort_col))
-    rows = q.offset((page - 1) * page_size).limit(page_size).all()
+    if with_total is None:
+        with_total = cursor is None
+    _reject_relevance_cursor(sort_by, cursor)
+    after = pagination.decode_cursor(cursor, sort_by, sort_dir) if cursor is not None else None
+    live_at = _live_bucket() if available_now else None
+    pickup_from, pickup_to = _naive_utc(pickup_from), _naive_utc(pickup_to)
+    categories = _parse_categories(category)
+    # verzija bags tabele se čita pre keša i upita: nepromenjen listing => 304 bez tela.
+    # Verzija je i deo ključa keša: telo iz keša uvek odgovara ETag-u (upis iz drugog worker-a,
+    # razmak između commit-a i _bags_changed, replika koja kasni)
+    version, changed_at = await versions.current(db, versions.BAGS)
+    cache_key = cache.make_key("public_bags_page", {
+        "page": page, "page_size": page_size, "search": search, "min_price": min_price,
+        "max_price": max_price, "category": ",".join(categories) or None, "sort_by": sort_by, "sort_dir": sort_dir,
+        "radius_km": within_km, "lat": lat, "lng": lng, "cursor": cursor, "with_total": with_total,
+        "live_at": live_at, "pickup_from": pickup_from, "pickup_to": pickup_to, "facets": facets or None,
+        "version": version,
+    })
+    # available_now: rezultat se menja i kad istekne termin, bez upisa -> Last-Modified prati i live_at
+    if live_at is not None and (changed_at is None or live_at > changed_at):
+        changed_at = live_at
+    etag = conditional.weak_etag(cache_key)
+    if conditional.is_fresh(request.headers, etag, changed_at):
+        return conditional.not_modified(etag, changed_at)
+    etag_headers = conditional.headers(etag, changed_at)
+    cached = bag_list_cache.get(cache_key)
+    if cached is not cache.MISSING:
+        return RawJSONResponse(cached, headers=etag_headers)
+    has_origin = lat is not None and lng is not None
+    if sort_by == "distance" and not (within_km and has_origin):
+        raise HTTPException(status_code=400, detail="sort_by=distance zahteva lat, lng i radius_km.")
+    q, sort_col = bag_queries.public(
+        DB_DIALECT, search, sort_by, min_price, max_price, live_at, pickup_from, pickup_to,
+        (lat, lng) if has_origin else None, within_km,
+    )
+    facet_base = q  # svi filteri osim kategorije
+    if categories:
+        q = q.filter(BagModel.category.in_(categories))
+    facet_counts = _Facets(categories) if facets else None
+    if facet_counts is not None:
+        # total iz istog agregata, bez posebnog COUNT upita
+        await _aggregate_facets(db, facet_base, facet_counts)
+        total = facet_counts.total
+    else:
+        total = await db.scalar(q.with_only_columns(func.count(BagModel.id))) if with_total else None
+    q = bag_queries.public_page(q, sort_col, sort_dir, page, page_size, cursor, after)
+    rows = (await db.execute(q)).all()
+    sort_values = {r.id: getattr(r, sort_col.key) for r in rows} if cursor is not None else {}
+    next_cursor = None
+    if cursor is not None and len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = pagination.encode_cursor(sort_by, sort_dir, sort_values[rows[-1].id], rows[-1].id)
     items = []
     for r in rows:
-        items.append({
-            "id": r.id,
-            "naziv": r.naziv,
-            "opis": r.opis,
-            "cena": float(r.cena),
-            "kolicina": r.kolicina,
-            "vreme_preuzimanja": r.vreme_preuzimanja,
-            "status": r.status,
-            "partner_id": r.partner_id,
-            "adresa": r.adresa,
-            "lat": r.lat,
-            "lng": r.lng,
-            "thumbnail_url": r.thumbnail_url,
+        item = serializers.bag_to_dict(r, serializers.BAG_PUBLIC_FIELDS)
+        if has_origin:
+            d = geo.haversine_km(lat, lng, r.lat, r.lng) if r.lat is not None and r.lng is not None else None
+            item["distance_km"] = round(d, 3) if d is not None else None
+        items.append(item)
+    if cursor is not None:
+        result = {"items": items, "total": total, "page_size": page_size, "next_cursor": next_cursor}
+    else:
+        result = {"items": items, "total": total, "page": page, "page_size": page_size}
+    if facet_counts is not None:
+        result["facets"] = facet_counts.to_dict()
+    body = serializers.dumps(result)
+    bag_list_cache.set(cache_key, body, tags=[BAGS_LIST_TAG] + [f"bag:{item['id']}" for item in items])
+    return RawJSONResponse(body, headers=etag_headers)
+
+# -----------------------------------------------------------------------------
+# Mapa: klasteri po mreži za udaljeni zoom, pojedinačni markeri tek na bližem
+# -----------------------------------------------------------------------------
+CLUSTER_ITEMS_ZOOM = int(os.getenv("CLUSTER_ITEMS_ZOOM", "15"))
+CLUSTER_MAX_CELLS = int(os.getenv("CLUSTER_MAX_CELLS", "4096"))  # ćelija u bbox-u (štiti od ogromnog GROUP BY)
+CLUSTER_MAX_ITEMS = int(os.getenv("CLUSTER_MAX_ITEMS", "2000"))
+MARKER_FIELDS = ("id", "lat", "lng", "cena", "naziv", "thumbnail_url")
+
+@app.get("/public/bags/clusters")
+async def public_bags_clusters(
+    request: Request,
+    bbox: str,
+    zoom: int = Query(..., ge=0, le=22),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Broj kesa, težište i najniža cena po ćeliji mreže (jedan GROUP BY); od CLUSTER_ITEMS_ZOOM
+    naviše vraća same markere. bbox = min_lng,min_lat,max_lng,max_lat."""
+    if BagModel is None:
+        return {"zoom": zoom, "clusters": [], "total": 0}
+    try:
+        west, south, east, north = geo.parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    items_mode = zoom >= CLUSTER_ITEMS_ZOOM
+    cell = geo.cluster_cell_deg(zoom)
+    if not items_mode and ((north - south) / cell + 1) * ((east - west) / cell + 1) > CLUSTER_MAX_CELLS:
+        raise HTTPException(status_code=400, detail="bbox je prevelik za zadati zoom.")
+    version, changed_at = await versions.current(db, versions.BAGS)
+    cache_key = cache.make_key("public_bags_clusters", {
+        "bbox": tuple(round(v, 6) for v in (west, south, east, north)), "zoom": zoom, "version": version,
+    })
+    etag = conditional.weak_etag(cache_key)
+    if conditional.is_fresh(request.headers, etag, changed_at):
+        return conditional.not_modified(etag, changed_at)
+    etag_headers = conditional.headers(etag, changed_at)
+    cached = bag_list_cache.get(cache_key)
+    if cached is not cache.MISSING:
+        return RawJSONResponse(cached, headers=etag_headers)
+
+    in_bbox = (models.bag_is_active(), BagModel.lat.between(south, north), BagModel.lng.between(west, east))
+    if items_mode:
+        q = select(*serializers.bag_columns(MARKER_FIELDS)).where(*in_bbox).order_by(desc(BagModel.id))
+        rows = (await db.execute(q.limit(CLUSTER_MAX_ITEMS + 1))).all()
+        items = [serializers.bag_to_dict(r, MARKER_FIELDS) for r in rows[:CLUSTER_MAX_ITEMS]]
+        result = {"zoom": zoom, "items": items, "total": len(items), "truncated": len(rows) > CLUSTER_MAX_ITEMS}
+    else:
+        # indeksi ćelija se računaju u podupitu, pa GROUP BY ide po koloni (Postgres ne poredi izraze sa parametrima)
+        grid = select(
+            geo.grid_index(BagModel.lat, 90.0, cell, DB_DIALECT).label("gy"),
+            geo.grid_index(BagModel.lng, 180.0, cell, DB_DIALECT).label("gx"),
+            BagModel.lat, BagModel.lng, BagModel.cena,
+        ).where(*in_bbox).subquery()
+        q = select(
+            grid.c.gy, grid.c.gx, func.count(), func.avg(grid.c.lat), func.avg(grid.c.lng), func.min(grid.c.cena),
+        ).group_by(grid.c.gy, grid.c.gx)
+        clusters = []
+        for gy, gx, n, lat, lng, min_price in await db.execute(q):
+            cell_west, cell_south = gx * cell - 180.0, gy * cell - 90.0
+            clusters.append({
+                "lat": round(lat, 6), "lng": round(lng, 6), "count": n, "min_price": float(min_price),
+                "bbox": [round(cell_west, 6), round(cell_south, 6), round(cell_west + cell, 6), round(cell_south + cell, 6)],
+            })
+        result = {"zoom": zoom, "cell_deg": cell, "clusters": clusters, "total": sum(c["count"] for c in clusters)}
+    body = serializers.dumps(result)
+    bag_list_cache.set(cache_key, body, tags=[BAGS_LIST_TAG])
+    return RawJSONResponse(body, headers=etag_headers)
+
+TILE_CACHE_CONTROL = os.getenv("TILE_CACHE_CONTROL", "public, max-age=30, stale-while-revalidate=60")
+
+@app.get("/public/bags/tiles/{z}/{x}/{y}")
+async def public_bag_tile(z: int, x: int, y: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    """Aktivne kese u web-mercator pločici kao kompaktni redovi (redosled iz "fields")."""
+    if not tiles.TILE_MIN_ZOOM <= z <= tiles.TILE_MAX_ZOOM:
+        raise HTTPException(status_code=400, detail=f"Zoom mora biti {tiles.TILE_MIN_ZOOM}-{tiles.TILE_MAX_ZOOM} "
+                                                    "(za manji zoom: /public/bags/clusters).")
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="Pločica ne postoji.")
+    # verzija bags tabele iz baze: svi worker-i daju isti ETag, a lokalni keš ne vraća pločicu
+    # staru pre upisa iz drugog worker-a (ključ se menja sa verzijom)
+    version, changed_at = await versions.current(db, versions.BAGS)
+    etag = conditional.weak_etag("tile", z, x, y, version)
+    if conditional.is_fresh(request.headers, etag, changed_at):
+        return conditional.not_modified(etag, changed_at, cache_control=TILE_CACHE_CONTROL)
+    key = f"{z}/{x}/{y}@{version}"
+    body = tile_cache.get(key)
+    if body is cache.MISSING:
+        west, south, east, north = tiles.tile_bounds(z, x, y)
+        # poluotvoren opseg: kesa na ivici pripada tačno jednoj pločici (kao tiles.tile_for)
+        q = select(*serializers.bag_columns(tiles.MARKER_FIELDS)).where(
+            models.bag_is_active(),
+            BagModel.lat >= south, BagModel.lat < north, BagModel.lng >= west, BagModel.lng < east,
+        ).order_by(desc(BagModel.id)).limit(tiles.TILE_MAX_ITEMS + 1)
+        rows = (await db.execute(q)).all()
+        body = serializers.dumps({
+            "z": z, "x": x, "y": y, "fields": tiles.MARKER_FIELDS,
+            "items": [[r.id, r.lat, r.lng, float(r.cena), r.thumbnail_url] for r in rows[:tiles.TILE_MAX_ITEMS]],
+            "truncated": len(rows) > tiles.TILE_MAX_ITEMS,
         })
-    return {"items": items, "total": total, "page": page, "page_size": page_size}
+        tile_cache.set(key, body, tags=[tiles.tile_tag(z, x, y)] + [f"bag:{r.id}" for r in rows])
+    return RawJSONResponse(body, headers=conditional.headers(etag, changed_at, cache_control=TILE_CACHE_CONTROL))
+
+# -----------------------------------------------------------------------------
+# Realtime: promene kesa po id-ju ili oblasti (WebSocket i SSE, isti hub)
+# -----------------------------------------------------------------------------
+def _realtime_frame(batch) -> str:
+    if batch and batch[0] is realtime.RESYNC:
+        return '{"type":"resync"}'
+    return serializers.dumps({"type": "bags", "events": batch}).decode("utf-8")
+
+@app.websocket("/ws/bags")
+async def ws_bags(websocket: WebSocket):
+    """?ids=1,2,3 i/ili ?lat=&lng=&radius_km=; poruka {"ids": [...], "lat": ...} menja pretplatu."""
+    await websocket.accept()
+    params = websocket.query_params
+    try:
+        ids, area = realtime.parse_filter(params.get("ids"), params.get("lat"), params.get("lng"), params.get("radius_km"))
+        sub = realtime.hub.subscribe(ids, area)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    except realtime.HubFull:
+        await websocket.close(code=1013, reason="Previše pretplatnika, pokušajte kasnije.")
+        return
+
+    async def read_updates():
+        try:
+            while True:
+                msg = await websocket.receive_json()
+                try:
+                    if not isinstance(msg, dict):
+                        raise ValueError("Poruka mora biti JSON objekat.")
+                    ids, area = realtime.parse_filter(msg.get("ids"), msg.get("lat"), msg.get("lng"), msg.get("radius_km"))
+                except ValueError as e:
+                    await websocket.send_json({"type": "error", "detail": str(e)})
+                    continue
+                realtime.hub.update(sub, ids, area)
+                await websocket.send_json({"type": "subscribed", "ids": len(ids), "area": area})
+        except (WebSocketDisconnect, RuntimeError, ValueError):
+            pass
+        finally:
+            sub.close()
+
+    reader = asyncio.create_task(read_updates())
+    try:
+        while True:
+            batch = await sub.next_batch()
+            if batch is None:
+                break
+            await websocket.send_text(_realtime_frame(batch) if batch else '{"type":"ping"}')
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        reader.cancel()
+        realtime.hub.unsubscribe(sub)
+
+@app.get("/public/bags/stream")
+async def public_bags_stream(
+    request: Request,
+    ids: Optional[str] = None,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    radius_km: Optional[float] = None,
+):
+    """SSE varijanta /ws/bags za klijente bez WebSocket-a (isti filteri, samo server -> klijent)."""
+    try:
+        sub = realtime.hub.subscribe(*realtime.parse_filter(ids, lat, lng, radius_km))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except realtime.HubFull:
+        raise HTTPException(status_code=503, detail="Previše pretplatnika, pokušajte kasnije.")
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                batch = await sub.next_batch()
+                if batch is None:
+                    break
+                if not batch:
+                    yield ": ping\n\n"
+                    continue
+                event = "resync" if batch[0] is realtime.RESYNC else "bags"
+                yield f"event: {event}\ndata: {_realtime_frame(batch)}\n\n"
+        finally:
+            realtime.hub.unsubscribe(sub)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.get("/public/bags/{bag_id}")
-def public_bag_details(bag_id: int, db: Session = Depends(get_db)):
+async def public_bag_details(bag_id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
     if BagModel is None:
         raise HTTPException(status_code=404, detail="Kesa nije pronađena.")
-    r = db.query(BagModel).filter(BagModel.id == bag_id).first()
+    q = select(*serializers.bag_columns(extra=[BagModel.updated_at])).filter(BagModel.id == bag_id)
+    r = (await db.execute(q)).first()
     if not r:
         raise HTTPException(status_code=404, detail="Kesa nije pronađena.")
-    return {
-        "id": r.id,
-        "naziv": r.naziv,
-        "opis": r.opis,
-        "cena": float(r.cena),
-        "kolicina": r.kolicina,
-        "vreme_preuzimanja": r.vreme_preuzimanja,
-        "status": r.status,
-        "partner_id": r.partner_id,
-        "adresa": r.adresa,
-        "lat": r.lat,
-        "lng": r.lng,
-        "thumbnail_url": r.thumbnail_url,
-        "created_at": r.created_at,
-    }
+    changed_at = r.updated_at or r.created_at
+    etag = conditional.weak_etag("bag", bag_id, changed_at.isoformat())
+    if conditional.is_fresh(request.headers, etag, changed_at):
+        return conditional.not_modified(etag, changed_at)
+    return FastJSONResponse(serializers.bag_to_dict(r), headers=conditional.headers(etag, changed_at))
+
+MAX_RESERVE_UNITS = int(os.getenv("MAX_RESERVE_UNITS", "10"))
 
 @app.post("/public/bags/{bag_id}/reserve")
-def public_bag_reserve(bag_id: int, db: Session = Depends(get_db)):
+def public_bag_reserve(
+    bag_id: int,
+    kolicina: int = Query(1, ge=1, le=MAX_RESERVE_UNITS),
+    identity=Depends(get_optional_identity),
+    db: Session = Depends(get_db),
+):
     if BagModel is None:
         raise HTTPException(status_code=404, detail="Kesa nije pronađena.")
-    bag = db.query(BagModel).filter(BagModel.id == bag_id).first()
-    if not bag:
-        raise HTTPException(status_code=404, detail="Kesa nije pronađena.")
-    if bag.status != "active" or bag.kolicina <= 0:
+    # Jedan uslovni UPDATE: baza atomski proverava zalihu, nema read-modify-write trke
+    # ni eksplicitnog zaključavanja reda (SET izrazi vide staru vrednost kolicina).
+    stmt = (
+        update(BagModel)
+        .where(BagModel.id == bag_id, BagModel.status == "active", BagModel.kolicina >= kolicina)
+        .values(
+            kolicina=BagModel.kolicina - kolicina,
+            status=case((BagModel.kolicina - kolicina <= 0, "sold_out"), else_=BagModel.status),
+        )
+        .returning(BagModel.kolicina, BagModel.status, BagModel.cena, BagModel.partner_id, BagModel.lat, BagModel.lng)
+        .execution_options(synchronize_session=False)
+    )
+    row = db.execute(stmt).first()
+    if row is None:
+        db.rollback()
+        current = db.query(BagModel.status, BagModel.kolicina).filter(BagModel.id == bag_id).first()
+        if current is None:
+            raise HTTPException(status_code=404, detail="Kesa nije pronađena.")
+        if current.status == "active" and current.kolicina > 0:
+            raise HTTPException(status_code=400, detail=f"Dostupno je još samo {current.kolicina} kom.")
         raise HTTPException(status_code=400, detail="Kesa nije dostupna.")
-    bag.kolicina -= 1
-    if bag.kolicina <= 0:
-        bag.status = "sold_out"
+    remaining, new_status, cena, partner_id, lat, lng = row
+    _count_transition(db, partner_id, "active", new_status)
+    versions.mark(db, versions.BAGS)  # Core UPDATE ne prolazi kroz ORM flush
+    reservation_id = None
+    if ReservationModel is not None:
+        customer_id = identity["id"] if identity and identity.get("role") == "customer" else None
+        reservation = ReservationModel(
+            bag_id=bag_id, customer_id=customer_id, kolicina=kolicina, cena=float(cena), created_at=datetime.utcnow()
+        )
+        db.add(reservation)
+        db.flush()
+        reservation_id = reservation.id
     db.commit()
-    return {"ok": True, "bag_id": bag.id, "remaining": bag.kolicina, "status": bag.status}
+    _bags_changed([bag_id], membership=new_status != "active", partner_id=partner_id, points=[(lat, lng)])
+    _publish_bag("reserved", id=bag_id, kolicina=remaining, status=new_status, lat=lat, lng=lng)
+    return {"ok": True, "bag_id": bag_id, "remaining": remaining, "status": new_status,
+            "kolicina": kolicina, "reservation_id": reservation_id}
 
 # -----------------------------------------------------------------------------
 # Upload (apsolutni URL!)
 # -----------------------------------------------------------------------------
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "10")) * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# multipart zaglavlja i granice oko samog fajla
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+# limit se proverava dok telo stiže (i za chunked bez Content-Length), pre nego što ga Starlette spool-uje
+app.add_middleware(body_limit.BodySizeLimitMiddleware, limits={"/upload/image": MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD})
+
+def _static_url(name: str) -> str:
+    return f"{BACKEND_PUBLIC_URL}/static/uploads/{name}"
+
 @app.post("/upload/image")
-def upload_image(file: UploadFile = File(...)):
-    ext = os.path.splitext(file.filename)[1].lower() or ".bin"
-    safe_name = f"{uuid.uuid4().hex}{ext}"
+async def upload_image(file: UploadFile = File(...)):
+    ext = os.path.splitext(file.filename or "")[1].lower() or ".bin"
+    # čitanje u delovima + SHA-256 usput; ime po sadržaju => ista slika se čuva jednom
+    tmp = os.path.join(UPLOAD_DIR, f".tmp-{uuid.uuid4().hex}")
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp, "wb") as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="Slika je prevelika.")
+                hasher.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    digest = hasher.hexdigest()
+    safe_name = f"{digest}{ext}"
     dst = os.path.join(UPLOAD_DIR, safe_name)
-    with open(dst, "wb") as f:
-        f.write(file.file.read())
+    if os.path.exists(dst):
+        os.remove(tmp)
+    else:
+        os.replace(tmp, dst)
+
     rel = f"/static/uploads/{safe_name}"
     abs_url = f"{BACKEND_PUBLIC_URL}{rel}"
-    return {"url": abs_url, "path": rel}
+    # varijante samo za proverene slike; imena su deterministička (<sha>_<varijanta>.<format>), pa se
+    # URL-ovi vraćaju odmah — dok varijanta ne nastane, /static na tom URL-u služi original
+    variants: Dict[str, Dict[str, str]] = {}
+    thumbnail_url = abs_url
+    pending = False
+    if await run_in_threadpool(images.is_image, dst, ext, file.content_type):
+        variants = {
+            variant: {fmt: _static_url(name) for fmt, name in by_fmt.items()}
+            for variant, by_fmt in images.variant_names(digest).items()
+        }
+        thumbnail_url = variants["thumb"]["webp"]
+        pending = images.schedule_variants(dst, UPLOAD_DIR, digest)
+    return {"url": abs_url, "path": rel, "sha256": digest, "size": size,
+            "thumbnail_url": thumbnail_url, "variants": variants, "variants_pending": pending}
+
+# -----------------------------------------------------------------------------
+# Admin
+# -----------------------------------------------------------------------------
+@app.get("/admin/cache/stats")
+def admin_cache_stats(_admin=Depends(require_admin)):
+    return {"bag_list": bag_list_cache.stats(), "tiles": tile_cache.stats(), "identity": identity_cache.stats()}
+
+@app.get("/admin/realtime/stats")
+async def admin_realtime_stats(_admin=Depends(require_admin)):
+    # async: hub se menja samo iz event loop-a, pa se i čita odatle
+    return realtime.hub.stats()
+
+def _db_pools():
+    pools = [("sync", engine), ("async", async_engine)]
+    if database.HAS_REPLICA:
+        pools += [("replica_sync", database.replica_engine), ("replica_async", database.async_replica_engine)]
+    return pools
+
+@app.get("/admin/db/pool")
+def admin_db_pool(_admin=Depends(require_admin)):
+    """Živo stanje pool-ova (sync za partner/upis, async za javno čitanje, + replika ako je podešena)."""
+    return {name: database.pool_stats(eng) for name, eng in _db_pools()}
+
+@app.post("/admin/db/pool/reset")
+def admin_db_pool_reset(_admin=Depends(require_admin)):
+    """Nuluje brojače čekanja; vraća stanje pre reseta."""
+    out = admin_db_pool(_admin)
+    for _, eng in _db_pools():
+        if hasattr(eng.pool, "reset_stats"):
+            eng.pool.reset_stats()
+    return out
+
+@app.post("/admin/expiry/sweep")
+def admin_expiry_sweep(_admin=Depends(require_admin)):
+    """Ručni prolaz expiry sweeper-a (isto što i pozadinski posao, bez čekanja intervala)."""
+    return {"expired": expiry.sweep(SessionLocal, on_expired=_bags_expired)}
+
+@app.patch("/admin/partners/{partner_id}/active")
+def admin_set_partner_active(partner_id: int, is_active: bool, _admin=Depends(require_admin), db: Session = Depends(get_db)):
+    if PartnerModel is None:
+        raise HTTPException(status_code=500, detail="Partner model nije dostupan.")
+    partner = db.query(PartnerModel).filter(PartnerModel.id == partner_id).first()
+    if not partner:
+        raise HTTPException(status_code=404, detail="Partner nije pronađen.")
+    partner.is_active = is_active
+    db.commit()
+    # i pri aktivaciji: _load_identity kešira None za neaktivnog partnera
+    revoke_identity("partner", partner_id)
+    return {"ok": True, "id": partner_id, "is_active": is_active}
+
+# -----------------------------------------------------------------------------
+# Metrics (Prometheus)
+# -----------------------------------------------------------------------------
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # ako je podešen: Authorization: Bearer <token>
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(authorization: Optional[str] = Header(None)):
+    if METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=403, detail="Pristup metrikama nije dozvoljen.")
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 # -----------------------------------------------------------------------------
 # Health
 # -----------------------------------------------------------------------------
 @app.get("/health")
-def health():
-    return {"ok": True, "time": datetime.utcnow().isoformat()}
+async def health(db: AsyncSession = Depends(get_async_db)):
+    try:
+        await db.execute(text("SELECT 1"))
+    except SQLAlchemyError:
+        return JSONResponse(status_code=503, content={"ok": False, "db": False, "time": datetime.utcnow().isoformat()})
+    return {"ok": True, "db": True, "time": datetime.utcnow().isoformat()}
@@ -0,0 +1,192 @@
+# metrics.py
+# Prometheus metrike bez spoljne zavisnosti: latencija i veličina odgovora po šablonu rute,
+# broj SQL naredbi i vreme u bazi po zahtevu (before/after_cursor_execute + contextvar).
+import contextvars
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_fmt(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float], labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # labels -> [brojevi po bucket-u..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, series):
+                    cumulative += n
+                    le = f'le="{_fmt(bound)}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+                inf = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, inf)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_fmt(series[-2])}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+REQUESTS = Counter("http_requests_total", "HTTP zahtevi po ruti i statusu.", ("method", "route", "status"))
+LATENCY = Histogram("http_request_duration_seconds", "Trajanje zahteva (do poslednjeg bajta odgovora).",
+                    LATENCY_BUCKETS, ("method", "route"))
+RESPONSE_SIZE = Histogram("http_response_size_bytes", "Veličina tela odgovora.", SIZE_BUCKETS, ("method", "route"))
+DB_QUERIES = Histogram("db_queries_per_request", "Broj SQL naredbi po zahtevu.", QUERY_COUNT_BUCKETS, ("method", "route"))
+DB_TIME = Histogram("db_query_seconds_per_request", "Ukupno vreme SQL naredbi po zahtevu.",
+                    LATENCY_BUCKETS, ("method", "route"))
+DB_QUERIES_OUTSIDE = Counter("db_queries_outside_request_total", "SQL naredbe van HTTP zahteva (pozadinski poslovi).")
+
+REGISTRY = [REQUESTS, LATENCY, RESPONSE_SIZE, DB_QUERIES, DB_TIME, DB_QUERIES_OUTSIDE]
+
+
+def render() -> bytes:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+# -----------------------------------------------------------------------------
+# SQL po zahtevu
+# -----------------------------------------------------------------------------
+class _QueryStats:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# promenljiv objekat u contextvar-u: threadpool i SQLAlchemy greenlet-i dobijaju kopiju konteksta,
+# ali dele isti objekat, pa se brojanje vidi i u middleware-u
+_current: contextvars.ContextVar[Optional[_QueryStats]] = contextvars.ContextVar("request_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_query_start")
+    elapsed = time.perf_counter() - started.pop() if started else 0.0
+    stats = _current.get()
+    if stats is None:
+        DB_QUERIES_OUTSIDE.inc()
+        return
+    stats.count += 1
+    stats.seconds += elapsed
+
+
+def instrument_engine(engine) -> None:
+    """Sync Engine ili AsyncEngine (kači se na .sync_engine); višestruki poziv je bezbedan."""
+    target = getattr(engine, "sync_engine", engine)
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+# -----------------------------------------------------------------------------
+# ASGI middleware
+# -----------------------------------------------------------------------------
+def _route_label(scope, root_path: str) -> str:
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path  # šablon, npr. /public/bags/{bag_id} — ograničena kardinalnost
+    mounted = scope.get("root_path", "")[len(root_path):]
+    if mounted:
+        return mounted + "/{path}"
+    return "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Čist ASGI middleware (bez BaseHTTPMiddleware), ne baferuje telo odgovora."""
+
+    def __init__(self, app, exclude: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.exclude = tuple(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+        root_path = scope.get("root_path", "")
+        stats = _QueryStats()
+        token = _current.set(stats)
+        status = [500]
+        size = [0]
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                size[0] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            labels = (scope["method"], _route_label(scope, root_path))
+            REQUESTS.inc(labels + (str(status[0]),))
+            LATENCY.observe(labels, elapsed)
+            RESPONSE_SIZE.observe(labels, size[0])
+            DB_QUERIES.observe(labels, stats.count)
+            DB_TIME.observe(labels, stats.seconds)
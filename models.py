@@ -1,7 +1,10 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Index, event, literal, text
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 
+import geo
+import textsearch
+
 Base = declarative_base()
 
 class Partner(Base):
@@ -17,15 +20,35 @@ class Partner(Base):
     thumbnail_url = Column(String, nullable=True)
 
     # Sprint 8 — auth (poravnato sa 20250811_0003_auth_roles.py)
-    email = Column(String, nullable=True)
+    email = Column(String, nullable=True, index=True)
     login_username = Column(String, nullable=True, index=True)
     password_hash = Column(String, nullable=True)
     is_active = Column(Boolean, nullable=False, default=True)
 
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
+
     bags = relationship("Bag", back_populates="partner", cascade="all, delete-orphan")
 
+# javni listing čita samo aktivne kese -> parcijalni indeksi (isti uslov na Postgresu i SQLite-u)
+_ACTIVE = text("status = 'active'")
+
 class Bag(Base):
     __tablename__ = "bags"
+    # poravnato sa 20261018_0009_hot_query_indexes.py; vidi check_query_plans.py
+    __table_args__ = (
+        Index("ix_bags_active_status_id", "status", "id", postgresql_where=_ACTIVE, sqlite_where=_ACTIVE),
+        Index("ix_bags_active_cena_id", "cena", "id", postgresql_where=_ACTIVE, sqlite_where=_ACTIVE),
+        Index("ix_bags_active_created_at_id", "created_at", "id", postgresql_where=_ACTIVE, sqlite_where=_ACTIVE),
+        # expiry sweeper (vreme < sada) i available_now / pickup prozor (vreme >= sada); 20261018_0010
+        Index("ix_bags_active_pickup_id", "vreme_preuzimanja", "id", postgresql_where=_ACTIVE, sqlite_where=_ACTIVE),
+        # /public/bags/clusters: bbox + GROUP BY samo iz indeksa (covering); 20261018_0011
+        # filter po kategoriji + facet GROUP BY (kategorija, razred cene) samo iz indeksa; 20261018_0012
+        Index("ix_bags_active_category_cena", "category", "cena", postgresql_where=_ACTIVE, sqlite_where=_ACTIVE),
+        Index("ix_bags_active_lat_lng_cena", "lat", "lng", "cena", postgresql_where=_ACTIVE, sqlite_where=_ACTIVE),
+        Index("ix_bags_partner_id_id", "partner_id", "id"),
+        Index("ix_bags_partner_id_created_at", "partner_id", "created_at"),
+        Index("ix_bags_lat_lng", "lat", "lng"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     naziv = Column(String, nullable=False)
@@ -34,6 +57,7 @@ class Bag(Base):
     kolicina = Column(Integer, nullable=False, default=1)
     vreme_preuzimanja = Column(DateTime, nullable=True)
     status = Column(String, nullable=False, default="active")
+    category = Column(String, nullable=True)  # normalizovano (schemas.normalize_category)
 
     partner_id = Column(Integer, ForeignKey("partners.id"), nullable=False)
     partner = relationship("Partner", back_populates="bags")
@@ -46,6 +70,24 @@ class Bag(Base):
     thumbnail_url = Column(String, nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
+
+    # Prostorni indeks: grid ćelija izvedena iz lat/lng (vidi geo.py)
+    geo_cell = Column(String, nullable=True, index=True)
+
+    # Pretraga: naziv + opis bez dijakritika (vidi textsearch.py)
+    search_norm = Column(String, nullable=True)
+
+@event.listens_for(Bag, "before_insert")
+@event.listens_for(Bag, "before_update")
+def _bag_derived_columns(mapper, connection, target):
+    target.geo_cell = geo.cell_for(target.lat, target.lng)
+    target.search_norm = textsearch.document(target.naziv, target.opis)
+
+def bag_is_active():
+    """status = 'active' kao SQL literal, ne parametar: tek tada planer zna da upit pokrivaju parcijalni
+    indeksi iznad (SQLite ne čita red radi provere statusa; Postgres i u generičkom planu prepared naredbe)."""
+    return Bag.status == literal("active", literal_execute=True)
 
 # Sprint 8 — kupac (poravnato sa 20250811_0003_auth_roles.py)
 class User(Base):
@@ -57,3 +99,30 @@ class User(Base):
     password_hash = Column(String, nullable=False)
     is_active = Column(Boolean, nullable=False, default=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+# Rezervacije — ko je rezervisao koju kesu i koliko komada
+class Reservation(Base):
+    __tablename__ = "reservations"
+
+    id = Column(Integer, primary_key=True)
+    bag_id = Column(Integer, ForeignKey("bags.id", ondelete="SET NULL"), nullable=True, index=True)
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="SET NULL"), nullable=True, index=True)
+    kolicina = Column(Integer, nullable=False, default=1)
+    cena = Column(Float, nullable=False)  # jedinična cena u trenutku rezervacije
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+# Brojači kesa po partneru i statusu — održavaju ih endpointi za upis u istoj transakciji
+class PartnerBagCounter(Base):
+    __tablename__ = "partner_bag_counters"
+
+    partner_id = Column(Integer, ForeignKey("partners.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+# Verzije podataka po tabeli — osnova za ETag-ove javnih GET endpointa (vidi versions.py)
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
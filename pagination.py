@@ -0,0 +1,75 @@
+# pagination.py
+# Keyset (cursor) paginacija: neprozirni cursor nosi vrednost sort kolone + id poslednje stavke.
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, asc, desc, or_
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(sort_by: str, sort_dir: str, value: Any, last_id: int) -> str:
+    raw = json.dumps({"s": sort_by, "d": sort_dir, "v": _encode_value(value), "id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_dir: str) -> Optional[Dict[str, Any]]:
+    """Prazan cursor znači prvu stranu; cursor za drugi sort_by/sort_dir je neispravan."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if data["s"] != sort_by or data["d"] != sort_dir:
+            raise ValueError("sort mismatch")
+        return {"value": _decode_value(data["v"]), "id": int(data["id"])}
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Neispravan cursor.")
+
+
+def _nullable(col) -> bool:
+    try:
+        return col.property.columns[0].nullable
+    except (AttributeError, IndexError):
+        return True
+
+
+def apply_keyset(q, sort_col, id_col, sort_dir: str, after: Optional[Dict[str, Any]]):
+    """Stabilan redosled (NULL vrednosti uvek na kraju, pa id) + uslov "posle cursora"."""
+    descending = sort_dir == "desc"
+    order = desc if descending else asc
+    nullable = sort_col is not id_col and _nullable(sort_col)
+    # NOT NULL kolona: bez "IS NULL" ključa, pa redosled može da dođe direktno iz indeksa
+    if sort_col is id_col:
+        q = q.order_by(order(id_col))
+    elif not nullable:
+        q = q.order_by(order(sort_col), order(id_col))
+    else:
+        q = q.order_by(sort_col.is_(None), order(sort_col), order(id_col))
+    if after is None:
+        return q
+    value, last_id = after["value"], after["id"]
+    id_after = id_col < last_id if descending else id_col > last_id
+    if sort_col is id_col:
+        return q.filter(id_after)
+    if not nullable:
+        past = sort_col < value if descending else sort_col > value
+        return q.filter(or_(past, and_(sort_col == value, id_after)))
+    if value is None:
+        return q.filter(and_(sort_col.is_(None), id_after))
+    past = sort_col < value if descending else sort_col > value
+    return q.filter(or_(sort_col.is_(None), past, and_(sort_col == value, id_after)))
+
@@ -0,0 +1,224 @@
+# realtime.py
+# Push promena kesa klijentima (WebSocket /ws/bags, SSE /public/bags/stream), bez spoljnog brokera.
+# Upisi u sync endpointima (threadpool) zovu hub.publish(); događaj prelazi u event loop preko
+# call_soon_threadsafe i deli se pretplatama po id-ju kese ili po oblasti (centar + radius_km).
+#
+# Svaka pretplata drži najviše REALTIME_MAX_PENDING neposlatih kesa: novi događaj za istu kesu
+# zamenjuje stari (coalescing), a kad se red prepuni, sve se odbacuje i klijent dobija "resync"
+# (ponovo čita REST). Spor klijent tako nikad ne usporava upis ni ostale pretplatnike.
+# Hub je po procesu — sa više worker-a svaki proces šalje samo događaje iz sopstvenih upisa.
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import geo
+
+log = logging.getLogger(__name__)
+
+REALTIME_MAX_SUBSCRIBERS = int(os.getenv("REALTIME_MAX_SUBSCRIBERS", "10000"))
+REALTIME_MAX_PENDING = int(os.getenv("REALTIME_MAX_PENDING", "256"))  # kesa po pretplati
+REALTIME_MAX_IDS = int(os.getenv("REALTIME_MAX_IDS", "500"))
+REALTIME_MAX_RADIUS_KM = float(os.getenv("REALTIME_MAX_RADIUS_KM", "25"))
+REALTIME_COALESCE_S = float(os.getenv("REALTIME_COALESCE_MS", "250")) / 1000  # prozor spajanja
+REALTIME_HEARTBEAT_S = float(os.getenv("REALTIME_HEARTBEAT_S", "15"))
+
+Area = Tuple[float, float, float]  # (lat, lng, radius_km)
+
+RESYNC = {"op": "resync"}
+
+
+class HubFull(Exception):
+    pass
+
+
+def parse_filter(ids=None, lat=None, lng=None, radius_km=None) -> Tuple[Set[int], Optional[Area]]:
+    """ids kao "1,2,3" (query) ili lista (JSON poruka); ValueError sa porukom za klijenta."""
+    if isinstance(ids, str):
+        ids = [part for part in ids.split(",") if part.strip()]
+    try:
+        bag_ids = {int(i) for i in ids or ()}
+    except (TypeError, ValueError):
+        raise ValueError("ids mora biti lista celih brojeva.")
+    if len(bag_ids) > REALTIME_MAX_IDS:
+        raise ValueError(f"Najviše {REALTIME_MAX_IDS} kesa po pretplati.")
+    area = None
+    if lat is not None or lng is not None or radius_km is not None:
+        try:
+            lat, lng, radius_km = float(lat), float(lng), float(radius_km)
+        except (TypeError, ValueError):
+            raise ValueError("Oblast zahteva lat, lng i radius_km.")
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise ValueError("Neispravne koordinate.")
+        if not 0 < radius_km <= REALTIME_MAX_RADIUS_KM:
+            raise ValueError(f"radius_km mora biti između 0 i {REALTIME_MAX_RADIUS_KM:g}.")
+        area = (lat, lng, radius_km)
+    if not bag_ids and area is None:
+        raise ValueError("Potrebno je ids ili lat/lng/radius_km.")
+    return bag_ids, area
+
+
+class Subscription:
+    """Koristi se samo iz event loop-a (push iz Hub._dispatch, čitanje iz endpointa)."""
+
+    def __init__(self, ids: Set[int], area: Optional[Area], max_pending: int = REALTIME_MAX_PENDING):
+        self.ids, self.area = ids, area
+        self.max_pending = max_pending
+        self.cells: Optional[List[str]] = None
+        self.sent = 0
+        self.dropped = 0
+        self._pending: "OrderedDict[int, dict]" = OrderedDict()
+        self._overflow = False
+        self._closed = False
+        self._wakeup = asyncio.Event()
+
+    def matches(self, event: dict) -> bool:
+        if event["id"] in self.ids:
+            return True
+        if self.area is None or event.get("lat") is None or event.get("lng") is None:
+            return False
+        lat, lng, radius_km = self.area
+        return geo.haversine_km(lat, lng, event["lat"], event["lng"]) <= radius_km
+
+    def push(self, event: dict) -> None:
+        bag_id = event["id"]
+        previous = self._pending.get(bag_id)
+        if previous is not None:
+            # stanje kese posle oba događaja; "created" ostaje dok kesa nije obrisana
+            merged = {**previous, **event}
+            if previous["op"] == "created" and event["op"] != "deleted":
+                merged["op"] = "created"
+            self._pending[bag_id] = merged
+        elif self._overflow:
+            self.dropped += 1
+            return
+        elif len(self._pending) >= self.max_pending:
+            self.dropped += len(self._pending) + 1
+            self._pending.clear()
+            self._overflow = True
+        else:
+            self._pending[bag_id] = event
+        self._wakeup.set()
+
+    def close(self) -> None:
+        self._closed = True
+        self._wakeup.set()
+
+    async def next_batch(self, timeout: float = REALTIME_HEARTBEAT_S) -> Optional[List[dict]]:
+        """Lista događaja; [] posle timeout-a (heartbeat); None kad je pretplata zatvorena."""
+        if not self._wakeup.is_set():
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None if self._closed else []
+        if self._closed:
+            return None
+        if REALTIME_COALESCE_S > 0:
+            await asyncio.sleep(REALTIME_COALESCE_S)  # još izmena iste kese stiže u isti batch
+        self._wakeup.clear()
+        if self._overflow:
+            self._overflow = False
+            self._pending.clear()
+            return [RESYNC]
+        events = list(self._pending.values())
+        self._pending.clear()
+        self.sent += len(events)
+        return events
+
+
+class Hub:
+    def __init__(self, max_subscribers: int = REALTIME_MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self.published = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subs: Set[Subscription] = set()
+        self._by_id: Dict[int, Set[Subscription]] = {}
+        self._by_cell: Dict[str, Set[Subscription]] = {}
+        self._wide: Set[Subscription] = set()  # oblast preko MAX_PREFILTER_CELLS ćelija
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    # --- pretplate (event loop) ---
+    def subscribe(self, ids: Iterable[int] = (), area: Optional[Area] = None) -> Subscription:
+        if len(self._subs) >= self.max_subscribers:
+            raise HubFull()
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        sub = Subscription(set(ids), area)
+        self._subs.add(sub)
+        self._index(sub)
+        return sub
+
+    def update(self, sub: Subscription, ids: Iterable[int], area: Optional[Area]) -> None:
+        self._unindex(sub)
+        sub.ids, sub.area = set(ids), area
+        self._index(sub)
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        sub.close()
+        if sub in self._subs:
+            self._subs.discard(sub)
+            self._unindex(sub)
+
+    def _index(self, sub: Subscription) -> None:
+        for bag_id in sub.ids:
+            self._by_id.setdefault(bag_id, set()).add(sub)
+        sub.cells = geo.cells_covering(*sub.area) if sub.area else None
+        if sub.area and sub.cells is None:
+            self._wide.add(sub)
+        for cell in sub.cells or ():
+            self._by_cell.setdefault(cell, set()).add(sub)
+
+    def _unindex(self, sub: Subscription) -> None:
+        for bag_id in sub.ids:
+            subs = self._by_id.get(bag_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._by_id[bag_id]
+        for cell in sub.cells or ():
+            subs = self._by_cell.get(cell)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._by_cell[cell]
+        self._wide.discard(sub)
+        sub.cells = None
+
+    # --- događaji ---
+    def has_subscribers(self) -> bool:
+        """Grubo, iz bilo kog thread-a: batch upisi preskaču SELECT za događaje kad niko ne sluša."""
+        return bool(self._subs)
+
+    def publish(self, event: dict) -> None:
+        """Bezbedno iz bilo kog thread-a; poziva se posle commit-a. Bez pretplatnika ne radi ništa."""
+        loop = self._loop
+        if loop is None or not self._subs or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._dispatch, event)
+        except RuntimeError:  # loop se upravo gasi
+            pass
+
+    def _dispatch(self, event: dict) -> None:
+        self.published += 1
+        candidates = set(self._by_id.get(event["id"], ())) | self._wide
+        cell = geo.cell_for(event.get("lat"), event.get("lng"))
+        if cell is not None:
+            candidates |= self._by_cell.get(cell, set())
+        for sub in candidates:
+            if sub.matches(event):
+                sub.push(event)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subs),
+            "published": self.published,
+            "pending": sum(len(s._pending) for s in self._subs),
+            "dropped": sum(s.dropped for s in self._subs),
+        }
+
+
+hub = Hub()
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, validator
 from typing import Optional, List
 from datetime import datetime
 
+import textsearch
+
 # =================
 # PARTNER
 # =================
@@ -27,6 +29,21 @@ class Partner(PartnerBase):
 # =================
 # BAG
 # =================
+CATEGORY_MAX_LENGTH = 40
+
+def normalize_category(value: Optional[str]) -> Optional[str]:
+    # slug kao u generate_data: "Voće i povrće " -> "voce_i_povrce" (filter, facet brojevi)
+    if value is None:
+        return None
+    return textsearch.normalize(value).replace(" ", "_") or None
+
+def _validate_category(value: Optional[str]) -> Optional[str]:
+    # dužina se proverava posle normalizacije (razmaci oko naziva se ne računaju)
+    value = normalize_category(value)
+    if value is not None and len(value) > CATEGORY_MAX_LENGTH:
+        raise ValueError(f"Kategorija može imati najviše {CATEGORY_MAX_LENGTH} znakova.")
+    return value
+
 class BagBase(BaseModel):
     naziv: str
     opis: Optional[str] = None
@@ -34,12 +51,15 @@ class BagBase(BaseModel):
     kolicina: int
     vreme_preuzimanja: Optional[datetime] = None
     status: str = "active"
+    category: Optional[str] = None
     partner_id: int
     adresa: Optional[str] = None
     lat: Optional[float] = Field(default=None, ge=-90, le=90)
     lng: Optional[float] = Field(default=None, ge=-180, le=180)
     thumbnail_url: Optional[str] = None
 
+    _category = validator("category", allow_reuse=True)(_validate_category)
+
 class BagCreate(BagBase):
     pass
 
@@ -50,12 +70,27 @@ class BagUpdate(BaseModel):
     kolicina: Optional[int] = None
     vreme_preuzimanja: Optional[datetime] = None
     status: Optional[str] = None
+    category: Optional[str] = None
     partner_id: Optional[int] = None
     adresa: Optional[str] = None
     lat: Optional[float] = Field(default=None, ge=-90, le=90)
     lng: Optional[float] = Field(default=None, ge=-180, le=180)
     thumbnail_url: Optional[str] = None
 
+    _category = validator("category", allow_reuse=True)(_validate_category)
+
+# Batch izmene: svaka operacija je jedan UPDATE/DELETE ... WHERE id IN (...)
+class BagBatchOp(BaseModel):
+    op: str = Field(..., regex="^(status|update|delete)$")
+    ids: Optional[List[int]] = None
+    all: bool = False  # sve kese partnera (umesto ids)
+    where_status: Optional[str] = None  # dodatni filter, npr. samo "active"
+    status: Optional[str] = None  # za op="status"
+    fields: Optional[BagUpdate] = None  # za op="update"
+
+class BagBatch(BaseModel):
+    operations: List[BagBatchOp] = Field(..., min_items=1)
+
 class Bag(BagBase):
     id: int
     created_at: datetime
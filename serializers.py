@@ -0,0 +1,62 @@
+# serializers.py
+# Projekcije (samo potrebne kolone kao tuple/Row) i brza JSON serijalizacija preko orjson.
+# Jedno mesto za oblik kese u odgovorima — umesto ručno pisanih dict-ova po endpointima.
+from typing import Any, Iterable, List, Sequence
+
+import orjson
+from fastapi.responses import JSONResponse
+
+import models
+
+# javni listing/detalj (bez created_at u listingu, kao i do sada)
+BAG_PUBLIC_FIELDS = (
+    "id", "naziv", "opis", "cena", "kolicina", "vreme_preuzimanja", "status", "category",
+    "partner_id", "adresa", "lat", "lng", "thumbnail_url",
+)
+BAG_FIELDS = BAG_PUBLIC_FIELDS + ("created_at",)
+PARTNER_PUBLIC_FIELDS = ("id", "naziv", "adresa", "lat", "lng", "thumbnail_url")
+
+
+def columns(model, fields: Sequence[str], extra: Iterable[Any] = ()) -> List[Any]:
+    """Kolone za select(); extra su dodatni izrazi (npr. sort kolona za cursor)."""
+    cols = [getattr(model, f) for f in fields]
+    for col in extra:
+        if not any(col is c for c in cols):
+            cols.append(col)
+    return cols
+
+
+def bag_columns(fields: Sequence[str] = BAG_FIELDS, extra: Iterable[Any] = ()) -> List[Any]:
+    return columns(models.Bag, fields, extra)
+
+
+def to_dict(obj, fields: Sequence[str]) -> dict:
+    """Radi i za Row iz projekcije i za ORM entitet (getattr)."""
+    return {f: getattr(obj, f) for f in fields}
+
+
+def bag_to_dict(obj, fields: Sequence[str] = BAG_FIELDS) -> dict:
+    item = to_dict(obj, fields)
+    if item.get("cena") is not None:
+        item["cena"] = float(item["cena"])
+    return item
+
+
+def dumps(content: Any) -> bytes:
+    # orjson: datetime -> ISO 8601 kao i FastAPI-jev jsonable_encoder, bez međukoraka
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(JSONResponse):
+    """Već serijalizovano telo (npr. iz keša) — šalje se bez ponovnog renderovanja."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return content
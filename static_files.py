@@ -0,0 +1,160 @@
+# static_files.py
+# /static sa dugim keširanjem za upload-ovane slike.
+# Fajlovi u uploads/ su nepromenljivi (ime = uuid ili sha256 sadržaja), pa dobijaju
+# Cache-Control: immutable, jak ETag izveden iz imena, podršku za Range i izbor
+# WebP/AVIF varijante po Accept zaglavlju (varijante pravi images.py). Dok varijanta još nastaje,
+# njen URL služi original (bez immutable, da bi klijent kasnije dobio pravu varijantu).
+import os
+import posixpath
+import re
+import stat
+from email.utils import formatdate
+from typing import List, Optional, Tuple
+
+import anyio
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response, StreamingResponse
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+import images
+
+UPLOADS_PREFIX = "uploads/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PENDING_CACHE_CONTROL = "public, max-age=60"
+RANGE_CHUNK_SIZE = 64 * 1024
+
+_NEGOTIABLE_EXT = {".jpg", ".jpeg", ".png", ".webp"}
+_MEDIA_TYPES = {".avif": "image/avif", ".webp": "image/webp", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png"}
+_VARIANT_SUFFIXES = ("_thumb", "_card", "_full")
+# pregovara se samo ono što images.py zaista pravi (AVIF zavisi od Pillow build-a)
+_NEGOTIATED = tuple(f"image/{fmt}" for fmt in ("avif", "webp") if fmt in images.FORMATS)
+_VARIANT_NAME = re.compile(r"^(?P<digest>[0-9a-f]{64})_(?:%s)\.(?:%s)$" % ("|".join(images.VARIANTS), "|".join(images.FORMATS)))
+
+
+def _accepted(accept: str) -> List[str]:
+    """image/avif i image/webp (ako ih images.py pravi) iz Accept zaglavlja (q=0 znači odbijeno)."""
+    out = []
+    for part in accept.split(","):
+        media, _, params = part.strip().partition(";")
+        if media.strip() in _NEGOTIATED and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            out.append(media.strip())
+    # AVIF je manji, pa ima prednost
+    return sorted(out, key=lambda m: m != "image/avif")
+
+
+def _alternatives(full_path: str, accept: str) -> List[str]:
+    stem, ext = os.path.splitext(full_path)
+    if ext.lower() not in _NEGOTIABLE_EXT:
+        return []
+    # original <sha>.jpg -> <sha>_full.webp; varijanta <sha>_thumb.jpg -> <sha>_thumb.webp
+    base = stem if stem.endswith(_VARIANT_SUFFIXES) else stem + "_full"
+    return [base + "." + media.split("/")[1] for media in _accepted(accept) if "." + media.split("/")[1] != ext.lower()]
+
+
+def _pending_originals(path: str) -> List[str]:
+    """Za <sha>_<varijanta>.<format>: moguće putanje originala <sha>.<ext> iz istog upload-a."""
+    head, name = posixpath.split(path.replace("\\", "/"))
+    match = _VARIANT_NAME.match(name)
+    if not match:
+        return []
+    return [posixpath.join(head, match.group("digest") + ext) for ext in sorted(images.IMAGE_EXTENSIONS)]
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Jedan opseg "bytes=a-b" / "bytes=a-" / "bytes=-n"; None ako nije zadovoljiv."""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start_s, _, end_s = spec.strip().partition("-")
+    try:
+        if start_s == "":
+            length = int(end_s)
+            if length <= 0:
+                return None
+            return max(0, size - length), size - 1
+        start = int(start_s)
+        end = int(end_s) if end_s else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _read_range(path: str, start: int, end: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class UploadStaticFiles(StaticFiles):
+    def _lookup_pending(self, path: str) -> Tuple[str, Optional[os.stat_result]]:
+        for candidate in _pending_originals(path):
+            full_path, stat_result = self.lookup_path(candidate)
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                return full_path, stat_result
+        return "", None
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if not path.replace("\\", "/").startswith(UPLOADS_PREFIX):
+            return await super().get_response(path, scope)
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+        full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+        cache_control = IMMUTABLE_CACHE_CONTROL
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            full_path, stat_result = await anyio.to_thread.run_sync(self._lookup_pending, path)
+            if stat_result is None:
+                raise HTTPException(status_code=404)
+            cache_control = PENDING_CACHE_CONTROL
+
+        request_headers = Headers(scope=scope)
+        negotiable = cache_control == IMMUTABLE_CACHE_CONTROL and os.path.splitext(full_path)[1].lower() in _NEGOTIABLE_EXT
+        for alt in (_alternatives(full_path, request_headers.get("accept", "")) if negotiable else []):
+            try:
+                alt_stat = await anyio.to_thread.run_sync(os.stat, alt)
+            except FileNotFoundError:
+                continue
+            full_path, stat_result = alt, alt_stat
+            break
+
+        ext = os.path.splitext(full_path)[1].lower()
+        # ime fajla je već otisak sadržaja -> jak ETag bez čitanja fajla
+        etag = f'"{os.path.basename(full_path)}-{stat_result.st_size}"'
+        headers = {
+            "cache-control": cache_control,
+            "etag": etag,
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "accept-ranges": "bytes",
+        }
+        if negotiable:
+            headers["vary"] = "Accept"
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+
+        size = stat_result.st_size
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range.strip() == etag):
+            byte_range = _parse_range(range_header, size)
+            if byte_range is None:
+                return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+            start, end = byte_range
+            headers.update({"content-range": f"bytes {start}-{end}/{size}", "content-length": str(end - start + 1)})
+            media_type = _MEDIA_TYPES.get(ext)
+            if scope["method"] == "HEAD":
+                return Response(status_code=206, headers=headers, media_type=media_type)
+            return StreamingResponse(_read_range(full_path, start, end), status_code=206, headers=headers, media_type=media_type)
+
+        return FileResponse(full_path, stat_result=stat_result, headers=headers, media_type=_MEDIA_TYPES.get(ext),
+                            method=scope["method"])
@@ -0,0 +1,95 @@
+# stress_reserve.py
+# Konkurentni stres test za POST /public/bags/{bag_id}/reserve — dokazuje da nema overselling-a.
+#
+#   DATABASE_URL=postgresql+psycopg2://... python stress_reserve.py --requests 5000 --stock 1000
+#   DATABASE_URL=sqlite:///./stress.db python stress_reserve.py --create-tables
+#
+# Hiljade zahteva ide istovremeno na JEDNU kesu (in-process, httpx.ASGITransport); sync endpoint
+# radi u threadpool-u pa upiti zaista paralelno stižu do baze. Izlazni kod != 0 ako invarijante padnu.
+import argparse
+import asyncio
+import random
+import sys
+from collections import Counter
+from datetime import datetime
+
+import httpx
+from sqlalchemy import func, select
+
+import database
+import models
+import main
+
+database.engine.echo = False
+
+
+def create_bag(stock: int) -> int:
+    with database.SessionLocal() as db:
+        partner = models.Partner(naziv="Stress Pekara", is_active=True)
+        db.add(partner)
+        db.flush()
+        bag = models.Bag(naziv="Stress kesa", cena=3.5, kolicina=stock, status="active",
+                         partner_id=partner.id, created_at=datetime.utcnow())
+        db.add(bag)
+        db.commit()
+        return bag.id
+
+
+async def fire(bag_id: int, total: int, concurrency: int, max_units: int):
+    transport = httpx.ASGITransport(app=main.app)
+    results = []
+    remaining = iter(range(total))
+
+    async def worker(client):
+        for _ in remaining:
+            units = random.randint(1, max_units)
+            r = await client.post(f"/public/bags/{bag_id}/reserve", params={"kolicina": units})
+            results.append((r.status_code, units, r.json() if r.status_code < 500 else None))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress", timeout=300) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="paralelne rezervacije jedne kese")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=1000)
+    parser.add_argument("--max-units", type=int, default=3)
+    parser.add_argument("--create-tables", action="store_true", help="models.Base.metadata.create_all (lokalni SQLite)")
+    args = parser.parse_args()
+
+    if args.create_tables:
+        models.Base.metadata.create_all(bind=database.engine)
+    bag_id = create_bag(args.stock)
+    results = asyncio.run(fire(bag_id, args.requests, args.concurrency, args.max_units))
+
+    codes = Counter(code for code, _, _ in results)
+    reserved = sum(units for code, units, _ in results if code == 200)
+    with database.SessionLocal() as db:
+        bag = db.get(models.Bag, bag_id)
+        booked = db.scalar(select(func.coalesce(func.sum(models.Reservation.kolicina), 0))
+                           .where(models.Reservation.bag_id == bag_id))
+
+    print(f">> kesa #{bag_id}: zaliha {args.stock}, zahteva {len(results)}, statusi {dict(codes)}")
+    print(f">> uspešno rezervisano {reserved}, u reservations {booked}, preostalo {bag.kolicina} ({bag.status})")
+
+    failures = []
+    if bag.kolicina < 0:
+        failures.append("kolicina je negativna (oversell)")
+    if reserved + bag.kolicina != args.stock:
+        failures.append("rezervisano + preostalo != početna zaliha")
+    if booked != reserved:
+        failures.append("reservations se ne slaže sa uspešnim odgovorima")
+    if any(code >= 500 for code in codes):
+        failures.append("serverske greške")
+    if bag.kolicina == 0 and bag.status != "sold_out":
+        failures.append("rasprodata kesa nije označena kao sold_out")
+    for f in failures:
+        print("!! " + f)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,129 @@
+# textsearch.py
+# Pretraga kesa po nazivu i opisu preko normalizovane kolone bags.search_norm.
+#   Postgres: pg_trgm (GIN, ILIKE + word similarity) + tsvector GIN, rang = ts_rank + word_similarity
+#   SQLite:   FTS5 virtuelna tabela bags_fts (trigram tokenizer), rang = bm25
+# Normalizacija skida dijakritike (č/ć/š/ž/đ) i preslovljava ćirilicu, pa "cevapi" nalazi "Ćevapi".
+import re
+import unicodedata
+from typing import List, Optional
+
+from sqlalchemy import Float, Integer, and_, func, literal, literal_column, or_, text
+
+_TRANSLIT = {
+    "č": "c", "ć": "c", "š": "s", "ž": "z", "đ": "dj",
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "ђ": "dj", "е": "e", "ж": "z", "з": "z",
+    "и": "i", "ј": "j", "к": "k", "л": "l", "љ": "lj", "м": "m", "н": "n", "њ": "nj", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "ћ": "c", "у": "u", "ф": "f", "х": "h", "ц": "c",
+    "ч": "c", "џ": "dz", "ш": "s",
+}
+_TRANSLIT_TABLE = str.maketrans(_TRANSLIT)
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+# FTS5 trigram tokenizer ne može da traži kraće od 3 znaka
+_MIN_FTS_TOKEN = 3
+
+
+def normalize(value: Optional[str]) -> str:
+    """lowercase + ćirilica -> latinica + bez dijakritika + jedan razmak između reči."""
+    if not value:
+        return ""
+    value = value.lower().translate(_TRANSLIT_TABLE)
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", value).strip()
+
+
+def document(naziv: Optional[str], opis: Optional[str]) -> str:
+    return normalize(f"{naziv or ''} {opis or ''}")
+
+
+def tokens(term: str) -> List[str]:
+    return [t for t in normalize(term).split(" ") if t]
+
+
+def _fts_query(toks: List[str]) -> str:
+    # svaki token kao fraza -> podstring pretraga u trigram indeksu
+    return " AND ".join('"' + t.replace('"', '""') + '"' for t in toks)
+
+
+def _tsvector(model):
+    # 'simple' i '' kao SQL literali, ne parametri: tek tada izraz odgovara indeksu ix_bags_search_tsv
+    # i u generičkom planu prepared naredbe (asyncpg)
+    return func.to_tsvector(literal_column("'simple'"), func.coalesce(model.search_norm, literal_column("''")))
+
+
+def apply(q, model, term: str, dialect: str):
+    """Filtrira upit (Query ili Select) na kese koje odgovaraju pretrazi."""
+    toks = tokens(term)
+    if not toks:
+        return q
+    norm = " ".join(toks)
+    substring = and_(*[model.search_norm.like(f"%{t}%") for t in toks])
+    if dialect == "postgresql":
+        return q.filter(or_(
+            substring,
+            _tsvector(model).op("@@")(func.plainto_tsquery(literal_column("'simple'"), norm)),
+            model.search_norm.op("%>")(norm),  # word similarity — tolerancija na slovne greške
+        ))
+    if dialect == "sqlite":
+        fts_toks = [t for t in toks if len(t) >= _MIN_FTS_TOKEN]
+        short = [model.search_norm.like(f"%{t}%") for t in toks if len(t) < _MIN_FTS_TOKEN]
+        if not fts_toks:
+            return q.filter(and_(*short))
+        matched = text("SELECT rowid FROM bags_fts WHERE bags_fts MATCH :fts_q").bindparams(fts_q=_fts_query(fts_toks))
+        return q.filter(model.id.in_(matched), *short)
+    return q.filter(substring)
+
+
+def apply_ranked(q, model, term: str, dialect: str):
+    """Kao apply(), uz izraz za ORDER BY (veće = relevantnije): (upit, izraz).
+    SQLite: jedan MATCH spojen po rowid = id daje i filter i bm25 — bez korelisanog podupita po redu
+    i bez dodatnog IN (MATCH) filtera, koji bi planer probao za svaki spojeni red."""
+    toks = tokens(term)
+    if not toks:
+        return q, literal(0)
+    norm = " ".join(toks)
+    if dialect == "postgresql":
+        query = func.plainto_tsquery(literal_column("'simple'"), norm)
+        return apply(q, model, term, dialect), func.ts_rank(_tsvector(model), query) + func.word_similarity(norm, model.search_norm)
+    if dialect == "sqlite":
+        fts_toks = [t for t in toks if len(t) >= _MIN_FTS_TOKEN]
+        if fts_toks:
+            ranked = (
+                text("SELECT rowid, -bm25(bags_fts) AS rank FROM bags_fts WHERE bags_fts MATCH :fts_rank_q")
+                .bindparams(fts_rank_q=_fts_query(fts_toks))
+                .columns(rowid=Integer, rank=Float)
+                .subquery("fts_rank")
+            )
+            short = [model.search_norm.like(f"%{t}%") for t in toks if len(t) < _MIN_FTS_TOKEN]
+            return q.join(ranked, ranked.c.rowid == model.id).filter(*short), ranked.c.rank
+    # fallback: pogodak na početku dokumenta (= u nazivu) je bolji
+    rank = func.length(model.search_norm) - func.length(func.replace(model.search_norm, toks[0], ""))
+    return apply(q, model, term, dialect), rank
+
+
+# -----------------------------------------------------------------------------
+# SQLite FTS5 (lokalni razvoj): virtuelna tabela nad bags.search_norm + trigeri
+# -----------------------------------------------------------------------------
+_SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS bags_fts USING fts5("
+    "search_norm, content='bags', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS bags_fts_ai AFTER INSERT ON bags BEGIN "
+    "INSERT INTO bags_fts(rowid, search_norm) VALUES (new.id, new.search_norm); END",
+    "CREATE TRIGGER IF NOT EXISTS bags_fts_ad AFTER DELETE ON bags BEGIN "
+    "INSERT INTO bags_fts(bags_fts, rowid, search_norm) VALUES ('delete', old.id, old.search_norm); END",
+    "CREATE TRIGGER IF NOT EXISTS bags_fts_au AFTER UPDATE OF search_norm ON bags BEGIN "
+    "INSERT INTO bags_fts(bags_fts, rowid, search_norm) VALUES ('delete', old.id, old.search_norm); "
+    "INSERT INTO bags_fts(rowid, search_norm) VALUES (new.id, new.search_norm); END",
+]
+
+
+def install_sqlite_fts(conn) -> None:
+    """Idempotentno: pravi FTS tabelu/trigere i puni indeks ako je tabela tek napravljena."""
+    if conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bags'")).first() is None:
+        return
+    existed = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'bags_fts'")).first() is not None
+    for ddl in _SQLITE_FTS_DDL:
+        conn.execute(text(ddl))
+    if not existed:
+        conn.execute(text("INSERT INTO bags_fts(bags_fts) VALUES ('rebuild')"))
@@ -0,0 +1,57 @@
+# tiles.py
+# Web-mercator z/x/y pločice sa markerima kesa (/public/bags/tiles/{z}/{x}/{y}).
+# Pločica je ista za sve korisnike, pa se kešira u procesu i na CDN-u. ETag i ključ keša nose
+# verziju bags tabele iz baze (versions.current), pa se svi worker-i slažu posle upisa bilo kog od njih.
+# Keš unos nosi tagove "bag:<id>" za svaki marker i "tile:z/x/y"; upis kese u ovom procesu odmah
+# oslobađa pločice u kojima je kesa bila (bag tag) i one u koje je upravo došla (point_tags po zoom nivou).
+import math
+import os
+from typing import Iterable, List, Optional, Tuple
+
+TILE_MIN_ZOOM = int(os.getenv("TILE_MIN_ZOOM", "10"))  # ispod toga: /public/bags/clusters
+TILE_MAX_ZOOM = int(os.getenv("TILE_MAX_ZOOM", "18"))
+TILE_MAX_ITEMS = int(os.getenv("TILE_MAX_ITEMS", "1000"))
+
+MARKER_FIELDS = ("id", "lat", "lng", "cena", "thumbnail_url")
+
+_MAX_LAT = 85.0511287798  # granica web-mercator projekcije
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(west, south, east, north) u stepenima; y raste ka jugu (XYZ / OSM šema)."""
+    n = 2 ** z
+    west, east = x / n * 360.0 - 180.0, (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def tile_for(lat: float, lng: float, z: int) -> Tuple[int, int]:
+    n = 2 ** z
+    lat = max(-_MAX_LAT, min(_MAX_LAT, lat))
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(n - 1, max(0, x)), min(n - 1, max(0, y))
+
+
+def tile_tag(z: int, x: int, y: int) -> str:
+    return f"tile:{z}/{x}/{y}"
+
+
+def point_tags(points: Iterable[Tuple[Optional[float], Optional[float]]]) -> List[str]:
+    """Tagovi svih pločica (TILE_MIN_ZOOM..TILE_MAX_ZOOM) koje sadrže date tačke."""
+    tags = set()
+    for lat, lng in points:
+        if lat is None or lng is None:
+            continue
+        for z in range(TILE_MIN_ZOOM, TILE_MAX_ZOOM + 1):
+            tags.add(tile_tag(z, *tile_for(lat, lng, z)))
+    return sorted(tags)
+
+
+def invalidate(tile_cache, bag_ids: Iterable[int], points=None) -> int:
+    """points=None: pozicije nisu poznate (bulk/batch upis) -> briše se ceo keš pločica."""
+    if points is None:
+        tile_cache.clear()
+        return -1
+    return tile_cache.invalidate_tags([f"bag:{bid}" for bid in bag_ids] + point_tags(points))
@@ -0,0 +1,87 @@
+# versions.py
+# Brojači verzija po tabeli (data_versions) za ETag-ove javnih GET endpointa.
+# Svaki ORM flush koji dira praćeni model samo označi tabelu u sesiji; Core upisi (UPDATE ... RETURNING,
+# bulk) zovu mark() sami. Verzija se podiže tek posle commit-a, u zasebnoj kratkoj transakciji — da
+# upisi ne bi držali zaključan red data_versions (na Postgres-u bi se inače svi upisi serijalizovali).
+import logging
+from datetime import datetime
+from itertools import chain
+from typing import Optional, Tuple
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import models
+
+log = logging.getLogger(__name__)
+
+BAGS = "bags"
+PARTNERS = "partners"
+TRACKED = ((models.Bag, BAGS), (models.Partner, PARTNERS))
+
+_UPSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+_PENDING = "versions_pending"
+
+
+def bump(db, *names: str) -> None:
+    """db je Session ili Connection; podiže verzije u transakciji pozivaoca (vidi mark())."""
+    table = models.DataVersion.__table__
+    dialect = db.dialect if hasattr(db, "dialect") else db.get_bind().dialect
+    upsert = _UPSERTS.get(dialect.name)
+    now = datetime.utcnow()
+    for name in names:
+        if upsert is not None:
+            stmt = upsert(table).values(name=name, version=1, updated_at=now)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c.name],
+                set_={"version": table.c.version + 1, "updated_at": now},
+            ))
+            continue
+        res = db.execute(
+            update(table).where(table.c.name == name).values(version=table.c.version + 1, updated_at=now)
+        )
+        if res.rowcount == 0:
+            db.execute(insert(table).values(name=name, version=1, updated_at=now))
+
+
+async def current(db, name: str) -> Tuple[int, Optional[datetime]]:
+    """(verzija, vreme poslednje promene) — (0, None) dok tabela nije menjana."""
+    table = models.DataVersion.__table__
+    row = (await db.execute(select(table.c.version, table.c.updated_at).where(table.c.name == name))).first()
+    return (row[0], row[1]) if row else (0, None)
+
+
+def mark(session: Session, *names: str) -> None:
+    """Verzije se podižu posle commit-a sesije; rollback ih odbacuje."""
+    session.info.setdefault(_PENDING, set()).update(names)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_on_flush(session, flush_context):
+    names = set()
+    for obj in chain(session.new, session.deleted, session.dirty):
+        for model, name in TRACKED:
+            if isinstance(obj, model) and (obj not in session.dirty or session.is_modified(obj)):
+                names.add(name)
+    if names:
+        mark(session, *names)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session):
+    names = session.info.pop(_PENDING, None)
+    if not names:
+        return
+    # sesija posle commit-a ne sme da izvršava SQL -> zasebna konekcija i transakcija
+    try:
+        with session.get_bind().begin() as conn:
+            bump(conn, *sorted(names))
+    except Exception:  # podaci su već upisani; ETag-ovi kasne do sledećeg upisa
+        log.exception("Podizanje verzije %s nije uspelo", sorted(names))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(_PENDING, None)